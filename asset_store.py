@@ -0,0 +1,243 @@
+"""
+Content-addressed store for the generated voices and videos.
+
+An asset's file name is the hash of everything that decides its content:
+
+    segment – one TTS request's text + voice      → voices/segments/ab/<key>.mp3
+    audio   – summary part text + voice           → voices/<key>.mp3
+    video   – summary + template + audio hashes   → videos/<key>.mp4
+
+so two books with the same title never overwrite each other and an
+unchanged input is served from disk instead of being voiced or rendered
+again.  A small JSON index records when each asset was last used and which
+assets each book uses; ``gc()`` evicts assets unused for ASSET_MAX_AGE and,
+least recently used first, whatever exceeds ASSET_MAX_BYTES.
+
+    python asset_store.py gc                  # age / size based eviction
+    python asset_store.py gc --drop-missing   # also forget books no longer summarized
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import hashlib
+import threading
+
+import book_store
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+INDEX_PATH = os.path.join(book_store.DATA_DIR, "assets.json")
+KINDS      = {
+    #  kind       directory                            extension  fan-out
+    "segment": (os.path.join("voices", "segments"), ".mp3",     True),
+    "audio":   ("voices",                           ".mp3",     False),
+    "video":   ("videos",                           ".mp4",     False),
+}
+LEGACY_DIRS     = [os.path.join("voices", "cache")]   # pre-asset-store audio cache, swept by gc
+ASSET_MAX_AGE   = 30 * 24 * 3600   # evict assets unused for this long (seconds)
+ASSET_MAX_BYTES = 10 * 2**30       # then evict least recently used until under this size
+GC_GRACE        = 60 * 60          # leave unindexed files younger than this (writes in progress)
+FLUSH_INTERVAL  = 30               # seconds between index writes (and at exit)
+
+_KEY_FILE = re.compile(r"^[0-9a-f]{64}\.(mp3|mp4)$")
+_lock  = threading.RLock()
+_index = None               # {"assets": {key: {...}}, "books": {book_id: {kind: [keys]}}}
+_dirty = False
+_saved = 0.0                # time of the last index write
+
+# ——————————————————————————————————————————————————————————————
+# Keys & paths
+# ——————————————————————————————————————————————————————————————
+def asset_key(kind: str, *parts) -> str:
+    blob = json.dumps([kind, *parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def path(kind: str, key: str) -> str:
+    directory, ext, fan_out = KINDS[kind]
+    if fan_out:
+        directory = os.path.join(directory, key[:2])
+    return os.path.join(directory, f"{key}{ext}")
+
+def has(kind: str, key: str) -> bool:
+    return os.path.exists(path(kind, key))
+
+# ——————————————————————————————————————————————————————————————
+# Index
+# ——————————————————————————————————————————————————————————————
+def _load() -> dict:
+    global _index
+    if _index is None:
+        try:
+            with open(INDEX_PATH, encoding="utf-8") as f:
+                _index = json.load(f)
+        except (OSError, ValueError):
+            _index = {}
+        _index.setdefault("assets", {})
+        _index.setdefault("books", {})
+    return _index
+
+def _changed():
+    """Mark the index dirty; it is written at most every FLUSH_INTERVAL seconds."""
+    global _dirty
+    _dirty = True
+    if time.time() - _saved >= FLUSH_INTERVAL:
+        _flush_locked()
+
+def _flush_locked():
+    global _dirty, _saved
+    if _index is None or not _dirty:
+        return
+    os.makedirs(os.path.dirname(INDEX_PATH) or ".", exist_ok=True)
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_index, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, INDEX_PATH)
+    _dirty, _saved = False, time.time()
+
+def flush():
+    with _lock:
+        _flush_locked()
+
+atexit.register(flush)
+
+def touch(kind: str, key: str):
+    """Record that an asset was (re)used just now."""
+    fp = path(kind, key)
+    with _lock:
+        entry = _load()["assets"].setdefault(key, {"kind": kind, "path": fp})
+        entry["last_used"] = time.time()
+        if not entry.get("size") and os.path.exists(fp):
+            entry["size"] = os.path.getsize(fp)
+        _changed()
+
+def read(kind: str, key: str) -> bytes:
+    with open(path(kind, key), "rb") as f:
+        data = f.read()
+    touch(kind, key)
+    return data
+
+def write(kind: str, key: str, data: bytes) -> str:
+    """Store `data` under its key (atomically); returns the file path."""
+    fp = path(kind, key)
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    tmp = f"{fp}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, fp)
+    touch(kind, key)
+    return fp
+
+def link(book_id: str, kind: str, keys: list, title: str = None):
+    """Record that `book_id` now uses `keys`; its previous assets are left to gc."""
+    with _lock:
+        for key in keys:
+            touch(kind, key)
+        book = _load()["books"].setdefault(book_id, {})
+        book[kind] = list(keys)
+        if title:
+            book["title"] = title
+        _changed()
+
+def book_keys(book_id: str, kind: str) -> list:
+    with _lock:
+        return list(_load()["books"].get(book_id, {}).get(kind, []))
+
+def book_paths(book_id: str, kind: str) -> list:
+    """A book's existing asset files of one kind, in the order they were linked."""
+    return [fp for fp in (path(kind, k) for k in book_keys(book_id, kind)) if os.path.exists(fp)]
+
+# ——————————————————————————————————————————————————————————————
+# Garbage collection
+# ——————————————————————————————————————————————————————————————
+def _asset_files():
+    """Every hash-named file under the asset and legacy cache directories."""
+    roots = [directory for directory, _, _ in KINDS.values()] + LEGACY_DIRS
+    nested = {os.path.normpath(r) for r in roots}
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for directory, subdirs, names in os.walk(root):
+            # a kind's own directory is walked from its own root
+            subdirs[:] = [d for d in subdirs
+                          if os.path.normpath(os.path.join(directory, d)) not in nested]
+            for name in names:
+                if _KEY_FILE.match(name):
+                    yield os.path.join(directory, name)
+
+def gc(live_books=None, dry_run: bool = False, drop_missing: bool = False,
+       max_age: float = None, max_bytes: int = None) -> dict:
+    """Evict assets that have not been used recently.
+
+    Assets unused for `max_age` (default ASSET_MAX_AGE) go first; if the
+    rest still exceed `max_bytes` (ASSET_MAX_BYTES) the least recently used
+    go until they fit.  Assets of `live_books` (IDs still in the summaries)
+    are never evicted; with `drop_missing`, books outside that set are
+    forgotten first, so their assets age out like any other orphan.
+    Hash-named files the index does not know (and the legacy voices/cache/)
+    are removed once older than GC_GRACE; other files are left alone.
+    """
+    now       = time.time()
+    max_age   = ASSET_MAX_AGE if max_age is None else max_age
+    max_bytes = ASSET_MAX_BYTES if max_bytes is None else max_bytes
+    with _lock:
+        index = _load()
+        live  = set(live_books or ())
+        if live_books is not None and drop_missing and not dry_run:
+            for bid in [b for b in index["books"] if b not in live]:
+                del index["books"][bid]
+        protected = {key for bid, book in index["books"].items() if bid in live
+                     for kind in KINDS for key in book.get(kind, [])}
+
+        assets = index["assets"]
+        for key in [k for k, a in assets.items() if not os.path.exists(a["path"])]:
+            del assets[key]                                   # removed by hand
+        by_age = sorted((a.get("last_used", 0), key) for key, a in assets.items()
+                        if key not in protected)
+        total  = sum(a.get("size", 0) for a in assets.values())
+        doomed = []
+        for last_used, key in by_age:
+            if now - last_used > max_age or total > max_bytes:
+                doomed.append(key)
+                total -= assets[key].get("size", 0)
+
+        files = [assets[key]["path"] for key in doomed]
+        for fp in _asset_files():
+            if os.path.basename(fp).split(".")[0] not in assets and now - os.path.getmtime(fp) > GC_GRACE:
+                files.append(fp)
+
+        freed = 0
+        for fp in files:
+            if os.path.exists(fp):
+                freed += os.path.getsize(fp)
+                if not dry_run:
+                    os.remove(fp)
+        if not dry_run:
+            gone = set(doomed)
+            for key in doomed:
+                del assets[key]
+            for book in index["books"].values():
+                for kind in KINDS:
+                    if gone.intersection(book.get(kind, [])):
+                        del book[kind]                        # re-made on the next run
+            _changed()
+            _flush_locked()
+    verb = "would free" if dry_run else "freed"
+    print(f"[INFO] Asset GC → {len(files)} evicted files, {verb} {freed / 2**20:.1f} MB "
+          f"({total / 2**20:.1f} MB kept)")
+    return {"files": len(files), "bytes": freed}
+
+def live_book_ids(summary_file: str = book_store.SUMMARIES_PATH) -> set:
+    if not os.path.exists(summary_file):
+        return set()
+    return {book_store.book_id(b) for b in book_store.iter_records(summary_file)}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["gc"]:
+        sys.exit("usage: python asset_store.py gc [--dry-run] [--drop-missing]")
+    gc(live_book_ids() if os.path.exists(book_store.SUMMARIES_PATH) else None,
+       dry_run="--dry-run" in sys.argv, drop_missing="--drop-missing" in sys.argv)
@@ -1,23 +1,24 @@
-import requests
-from fetch_books import fetch_books_from_gutenberg
-from summarize import summarize_text
-from text_to_speech import generate_voiceover
-from video_generator import generate_video
+import os
 
-for folder in ['voices', 'videos', 'assets']:
-    os.makedirs(folder, exist_ok=True)
+import batch
+import metrics
 
-def automate(query="productivity", max_books=1):
-    book_urls = fetch_books_from_gutenberg(query, max_books)
-    for url in book_urls:
-        try:
-            book_text = requests.get(url).text[:3000]
-            summary = summarize_text(book_text)
-            audio_path = generate_voiceover(summary)
-            video_path = generate_video(summary, audio_path)
-            print(f"Generated video: {video_path}")
-        except Exception as e:
-            print(f"Failed to process book from {url}: {e}")
+OPENING_CHARS = 3000     # only the opening of each book is summarized
+
+def automate(queries=("productivity",), max_books=1):
+    """Fetch → summarize → voice → video for several queries in one batch.
+
+    Books found by more than one query are processed once (see batch.py).
+    """
+    for folder in ['voices', 'videos', 'assets']:
+        os.makedirs(folder, exist_ok=True)
+    if isinstance(queries, str):
+        queries = [queries]
+    videos = batch.run_batch(list(queries), per_source=max_books, max_chars=OPENING_CHARS)
+    for video_path in videos:
+        print(f"Generated video: {video_path}")
+    return videos
 
 if __name__ == "__main__":
-    automate()
+    with metrics.instrumented("automate"):
+        automate(metrics.positional() or ["productivity"])
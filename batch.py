@@ -0,0 +1,236 @@
+"""
+Multi-niche batch runs with cross-niche deduplication.
+
+    python batch.py productivity "time management" habits stoicism
+
+The subject listings / search results for every niche are gathered
+concurrently, then merged: two candidates are the same book when they share
+a Gutenberg ID, an OpenLibrary work key or a normalized title + author.
+Each unique book is downloaded, summarized, voiced and rendered once and
+carries the list of niches that asked for it; ``data/niches.json`` maps
+every niche to its book IDs.
+"""
+
+import os
+import re
+import sys
+import json
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import asset_store
+import book_store
+import fetch_books
+import http_cache
+import manifest
+import metrics
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+NICHE_INDEX_PATH = os.path.join(book_store.DATA_DIR, "niches.json")
+NICHE_WORKERS    = 8       # niches whose listings are requested at once
+
+_ARTICLES = re.compile(r"^(the|a|an)\s+")
+
+# ——————————————————————————————————————————————————————————————
+# Identity keys
+# ——————————————————————————————————————————————————————————————
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+def normalize_title(title: str) -> str:
+    """'The Art of War: Translated…' → 'art of war'."""
+    title = re.split(r"[:;(\[]", title or "", maxsplit=1)[0]
+    return _ARTICLES.sub("", _fold(title))
+
+def normalize_author(name: str) -> str:
+    """Surname only, so 'Sun Tzu', 'Tzu, Sun' and 'SUN TZU' agree… mostly.
+
+    Gutenberg writes 'Last, First (dates)', OpenLibrary 'First Last'.
+    """
+    name = re.sub(r"\(.*?\)", "", name or "")
+    if "," in name:
+        name = name.split(",", 1)[0]
+    words = _fold(name).split()
+    return words[-1] if words else ""
+
+def identity_keys(source: str, item: dict) -> set:
+    """Every key under which a listing entry may already be known."""
+    keys = set()
+    if source == "gutenberg":
+        if item.get("id") is not None:
+            keys.add(("gutenberg", str(item["id"])))
+        authors = [a.get("name", "") for a in item.get("authors", [])]
+    else:
+        if item.get("key"):
+            keys.add(("openlibrary", item["key"]))
+        for gid in item.get("id_project_gutenberg") or []:
+            keys.add(("gutenberg", str(gid)))
+        authors = [a.get("name", "") if isinstance(a, dict) else a for a in item.get("authors", [])]
+    title = normalize_title(item.get("title", ""))
+    if title:
+        keys.add(("title", title, normalize_author(authors[0]) if authors else ""))
+    return keys
+
+# ——————————————————————————————————————————————————————————————
+# Listing & merging
+# ——————————————————————————————————————————————————————————————
+def _listings(niche: str, per_source: int) -> list:
+    """(source, item) candidates for one niche – no details / texts yet."""
+    gut = fetch_books.gutenberg_candidates(niche, per_source)
+    ol  = fetch_books.openlibrary_works(niche, per_source)
+    return [("gutenberg", item) for item in gut] + [("openlibrary", item) for item in ol]
+
+def merge_candidates(listings: dict) -> list:
+    """Collapse {niche: [(source, item), …]} into unique candidates.
+
+    Listings sharing any identity key are the same book, transitively (an
+    entry matching two earlier ones on different keys joins them), so the
+    grouping is a union-find over identity_keys.  Returns dicts
+    {source, item, niches, keys} in first-seen order; Gutenberg entries win
+    over OpenLibrary ones for the same book since they come with a full text.
+    """
+    entries = [(niche, source, item, identity_keys(source, item))
+               for niche, candidates in listings.items() for source, item in candidates]
+    parent = list(range(len(entries)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}                                   # identity key → first entry with it
+    for i, (_, _, _, keys) in enumerate(entries):
+        for k in keys:
+            if k in owner:
+                a, b = find(owner[k]), find(i)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                owner[k] = i
+
+    groups = {}
+    for i, (niche, source, item, keys) in enumerate(entries):
+        match = groups.get(find(i))
+        if match is None:
+            match = groups[find(i)] = {"source": source, "item": item, "niches": [], "keys": set()}
+        elif source == "gutenberg" and match["source"] != "gutenberg":
+            match.update(source=source, item=item)
+        if niche not in match["niches"]:
+            match["niches"].append(niche)
+        match["keys"] |= keys
+    return list(groups.values())
+
+def _download(candidate: dict, max_chars=None):
+    if candidate["source"] == "gutenberg":
+        book = fetch_books._fetch_gutenberg_book(candidate["item"], max_chars)
+    else:
+        book = fetch_books._fetch_ol_work(candidate["item"])
+    if book:
+        book["niches"] = candidate["niches"]
+        if max_chars:
+            book["full_text"] = (book.get("full_text") or "")[:max_chars]
+    return book
+
+def fetch_niches(niches, per_source=5, workers=None, niche_workers=None, max_chars=None):
+    """Fetch every niche concurrently; each unique book is downloaded once.
+
+    Saves the merged books to BOOK_PATH and the niche → book-ID links to
+    NICHE_INDEX_PATH; returns the list of books.  With `max_chars` only the
+    opening of each Gutenberg text is streamed (automate.py only summarizes
+    the start of a book).
+    """
+    workers = fetch_books.FETCH_WORKERS if workers is None else workers
+    niche_workers = NICHE_WORKERS if niche_workers is None else niche_workers
+    niches = list(dict.fromkeys(n.strip() for n in niches if n.strip()))
+    print(f"[INFO] >>> Batch fetch: {len(niches)} niches, {per_source} per source each")
+    with ThreadPoolExecutor(max_workers=max(1, min(niche_workers, len(niches)))) as pool:
+        listings = dict(zip(niches, pool.map(lambda n: _listings(n, per_source), niches)))
+
+    candidates = merge_candidates(listings)
+    total = sum(len(c) for c in listings.values())
+    metrics.incr("duplicates_skipped", total - len(candidates), stage="fetch")
+    print(f"[INFO] Batch → {total} listings, {len(candidates)} unique books "
+          f"({total - len(candidates)} cross-niche duplicates skipped)")
+
+    books = [b for b in fetch_books.parallel_map(lambda c: _download(c, max_chars), candidates, workers)
+             if b]
+
+    fetch_books.save_books(books)
+    save_niche_index(books, niches)
+    http_cache.flush()
+    http_cache.log_stats()
+    return books
+
+def save_niche_index(books, niches):
+    """Write {niche: [book IDs]} so results can be regrouped per niche."""
+    index = {niche: [] for niche in niches}
+    for book in books:
+        for niche in book.get("niches", []):
+            index.setdefault(niche, []).append(book_store.book_id(book))
+    os.makedirs(os.path.dirname(NICHE_INDEX_PATH) or ".", exist_ok=True)
+    tmp = NICHE_INDEX_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, NICHE_INDEX_PATH)
+
+def load_niche_index() -> dict:
+    try:
+        with open(NICHE_INDEX_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# ——————————————————————————————————————————————————————————————
+# Full run
+# ——————————————————————————————————————————————————————————————
+def run_batch(niches, per_source=5, force=False, max_chars=None):
+    """fetch (all niches) → summarize → voice → video, each unique book once."""
+    from summarize import summarize_books
+    from voice_generator import generate_voices
+    from video_generator import generate_videos
+
+    if force:
+        manifest.clear()
+
+    print("[STEP 1] Fetching books for all niches...")
+    fetch_key = manifest.input_hash(sorted(niches), per_source, max_chars)
+    if manifest.run_is_fresh("batch_fetch", fetch_key) and os.path.exists(book_store.BOOKS_PATH):
+        books = sum(1 for _ in book_store.iter_books())
+        print(f"[INFO] Reusing today's batch fetch ({books} books in {book_store.BOOKS_PATH})")
+    else:
+        with metrics.span("stage", stage="fetch"):
+            books = len(fetch_niches(niches, per_source, max_chars=max_chars))
+        if books:
+            manifest.mark_run("batch_fetch", fetch_key, books=books)
+    if not books:
+        print("[ERROR] No books fetched. Exiting batch.")
+        return []
+
+    print("[STEP 2] Generating summaries...")
+    with metrics.span("stage", stage="summarize"):
+        if not summarize_books():
+            print("[ERROR] No summaries produced. Skipping voice and video generation.")
+            return []
+
+    print("[STEP 3] Generating voice files...")
+    with metrics.span("stage", stage="voice"):
+        generate_voices()
+
+    print("[STEP 4] Generating videos...")
+    with metrics.span("stage", stage="video"):
+        videos = generate_videos()
+    asset_store.gc(asset_store.live_book_ids())
+
+    for niche, ids in load_niche_index().items():
+        print(f"[INFO] `{niche}` → {len(ids)} books")
+    print("[INFO] Batch completed successfully!")
+    return videos
+
+if __name__ == "__main__":
+    with metrics.instrumented("batch"):
+        run_batch(metrics.positional() or ["productivity"], force="--force" in sys.argv)
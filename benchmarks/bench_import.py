@@ -0,0 +1,120 @@
+"""
+Cold-start import benchmark for the pipeline modules.
+
+    python benchmarks/bench_import.py                    # every module, 5 runs each
+    python benchmarks/bench_import.py --budget-ms 150    # exit 1 if any module is slower
+
+Each import runs in a fresh interpreter, in an empty scratch directory and
+without API keys, the way a worker process or CLI subcommand starts.  The
+report gives the median wall time per module, the slowest dependencies
+from ``-X importtime`` and any files the import left behind (importing
+should not create directories or install packages).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MODULES = [
+    "asset_store", "book_store", "catalog", "chunker", "manifest", "metrics", "http_cache", "summary_cache",
+    "rate_limit", "summarizers", "fetch_books", "summarize", "voice_generator",
+    "local_renderer", "video_generator", "pipeline", "batch", "generate_all", "automate", "cli",
+]
+SECRETS = ("COHERE_API_KEY", "CREATOMATE_API_KEY")
+
+def _env() -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in SECRETS}
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+def import_once(module: str) -> dict:
+    """Import `module` in a new interpreter; returns timing and side effects."""
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as cwd:
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=cwd, env=_env(), capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        leftovers = sorted(os.listdir(cwd))
+    imports, errors = [], []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, cumulative, name = (p.strip() for p in line[len("import time:"):].split("|"))
+            if self_us.isdigit():
+                imports.append((name, int(self_us), int(cumulative)))
+        elif line.strip():
+            errors.append(line)
+    own = next((c for n, _, c in imports if n == module), None)
+    return {"wall_ms": wall * 1000, "import_ms": own / 1000 if own else None, "imports": imports,
+            "ok": proc.returncode == 0, "error": errors[-1] if proc.returncode else None,
+            "leftovers": leftovers}
+
+def bench_module(module: str, runs: int) -> dict:
+    samples = [import_once(module) for _ in range(runs)]
+    last = samples[-1]
+    heaviest = sorted(last["imports"], key=lambda i: i[1], reverse=True)[:5]
+    return {
+        "module":         module,
+        "ok":             all(s["ok"] for s in samples),
+        "error":          next((s["error"] for s in samples if s["error"]), None),
+        "wall_ms":        round(statistics.median(s["wall_ms"] for s in samples), 1),
+        "import_ms":      round(statistics.median(s["import_ms"] or 0 for s in samples), 1),
+        "modules_loaded": len(last["imports"]),
+        "heaviest":       [{"module": n, "self_ms": round(us / 1000, 2)} for n, us, _ in heaviest],
+        "leftovers":      sorted({f for s in samples for f in s["leftovers"]}),
+    }
+
+def baseline(runs: int) -> float:
+    """Bare interpreter start-up, subtracted mentally from the wall times."""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=_env(), check=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 1)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("modules", nargs="*", default=MODULES)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, help="fail when a module's own import exceeds this")
+    p.add_argument("--out", help="results file (default: benchmarks/results/import-<time>.json)")
+    args = p.parse_args(argv)
+
+    python_ms = baseline(args.runs)
+    results = [bench_module(m, args.runs) for m in args.modules]
+
+    print(f"\n[INFO] bare interpreter: {python_ms:.0f} ms")
+    print(f"{'module':<18} {'wall ms':>8} {'import ms':>10} {'loaded':>7}  heaviest dependency")
+    failed = []
+    for r in results:
+        top = r["heaviest"][0] if r["heaviest"] else {"module": "-", "self_ms": 0}
+        print(f"{r['module']:<18} {r['wall_ms']:>8.1f} {r['import_ms']:>10.1f} {r['modules_loaded']:>7}  "
+              f"{top['module']} ({top['self_ms']:.1f} ms)")
+        if not r["ok"]:
+            failed.append(f"{r['module']}: import failed – {r['error']}")
+        if r["leftovers"]:
+            failed.append(f"{r['module']}: import created {', '.join(r['leftovers'])}")
+        if args.budget_ms and r["import_ms"] > args.budget_ms:
+            failed.append(f"{r['module']}: {r['import_ms']:.0f} ms > budget {args.budget_ms:.0f} ms")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"import-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"python": sys.version.split()[0], "interpreter_ms": python_ms,
+                   "runs": args.runs, "results": results}, f, indent=2)
+    print(f"[INFO] Results written to {out}")
+
+    for msg in failed:
+        print(f"[WARN] {msg}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+End-to-end pipeline benchmark against local replay services.
+
+    python benchmarks/bench_pipeline.py                      # 10, 100, 1000 books
+    python benchmarks/bench_pipeline.py --sizes 10 --latency-ms 50 --throttle 0.05
+
+Every corpus size runs in a fresh subprocess and a scratch directory, with
+OpenLibrary / Gutendex / Gutenberg / Cohere / TTS / render traffic served
+by ``stub_services``.  For each stage (fetch, split, summarize, voice,
+video) the run records wall time, throughput, p50/p95 per-call latency and
+peak RSS, and writes everything to a JSON results file so runs can be
+diffed.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+STAGES = ("fetch", "split", "summarize", "voice", "video")
+
+# ——————————————————————————————————————————————————————————————
+# Measurement helpers
+# ——————————————————————————————————————————————————————————————
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+class RssSampler:
+    """Background sampler giving the peak RSS seen during one stage."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = rss_mb()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def timed(module, name, samples, since=None):
+    """Wrap module.name so every call appends its duration to `samples`.
+
+    With `since` (a perf_counter start), the completion time relative to
+    it is recorded instead – used for "time until this video was ready".
+    """
+    fn = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            samples.append(end - (since[0] if since else t0))
+
+    setattr(module, name, wrapper)
+
+def stage_result(seconds, items, samples, peak):
+    return {
+        "seconds":     round(seconds, 4),
+        "items":       items,
+        "throughput":  round(items / seconds, 3) if seconds else None,
+        "calls":       len(samples),
+        "p50_ms":      round(percentile(samples, 0.50) * 1000, 2) if samples else None,
+        "p95_ms":      round(percentile(samples, 0.95) * 1000, 2) if samples else None,
+        "peak_rss_mb": round(peak, 1),
+    }
+
+# ——————————————————————————————————————————————————————————————
+# One corpus size (runs in its own process)
+# ——————————————————————————————————————————————————————————————
+def run_one(books: int, args) -> dict:
+    import stub_services
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    os.chdir(workdir)
+    server, base = stub_services.start(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        throttle=args.throttle, text_size=args.text_kb * 1024,
+        render_seconds=args.render_seconds)
+
+    os.environ.update({
+        "OPENLIBRARY_URL":    base,
+        "GUTENDEX_URL":       base,
+        "GUTENBERG_URL":      base,
+        "CREATOMATE_API_URL": f"{base}/v1/renders",
+        "CREATOMATE_API_KEY": "bench",
+        "COHERE_API_KEY":     "bench",
+    })
+    import book_store
+    import fetch_books
+    import metrics
+    import summarize
+    import voice_generator
+    import video_generator
+
+    fetch_books.USE_HTTP_CACHE = False           # measure cold fetches
+    summarize.co = stub_services.StubCohere(base)
+    voice_generator.gTTS = stub_services.stub_gtts(base)
+    video_generator.POLL_MIN, video_generator.POLL_MAX = 0.1, 1.0
+
+    samples = {stage: [] for stage in STAGES}
+    video_start = [0.0]
+    timed(fetch_books, "http_get", samples["fetch"])
+    timed(summarize, "summarize_chunk", samples["summarize"])
+    timed(voice_generator, "synthesize_segment", samples["voice"])
+    timed(video_generator, "download_file", samples["video"], since=video_start)
+
+    def split_all():
+        count = 0
+        for book in book_store.iter_books():
+            t0 = time.perf_counter()
+            count += len(summarize.split_text_into_parts(book_store.iter_text(book)))
+            samples["split"].append(time.perf_counter() - t0)
+        return count
+
+    def summary_count():
+        return sum(1 for _ in book_store.iter_summaries())
+
+    steps = [
+        ("fetch",     lambda: len(fetch_books.fetch_books("productivity", books // 2, concurrent=True))),
+        ("split",     split_all),
+        ("summarize", lambda: summarize.summarize_books(rate=args.api_rate) or 0),
+        ("voice",     lambda: (voice_generator.generate_voices(), summary_count())[1]),
+        ("video",     lambda: len(video_generator.generate_videos(
+                          concurrency=args.render_concurrency))),
+    ]
+    result = {"books": books, "stages": {}}
+    for name, step in steps:
+        with RssSampler() as rss:
+            t0 = time.perf_counter()
+            video_start[0] = t0
+            items = step()
+            seconds = time.perf_counter() - t0
+        result["stages"][name] = stage_result(seconds, items, samples[name], rss.peak)
+        print(f"[INFO] bench {books:>5} books · {name:<9} {seconds:8.2f}s  items={items}", flush=True)
+
+    result["requests"] = dict(server.RequestHandlerClass.counts)
+    result["metrics"] = metrics.snapshot()
+    server.shutdown()
+    os.chdir(ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+# ——————————————————————————————————————————————————————————————
+# Driver
+# ——————————————————————————————————————————————————————————————
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sizes", default="10,100,1000", help="comma-separated corpus sizes")
+    p.add_argument("--latency-ms", type=float, default=20.0, help="per-request service latency")
+    p.add_argument("--jitter-ms", type=float, default=5.0)
+    p.add_argument("--throttle", type=float, default=0.02, help="fraction of Cohere calls answered 429")
+    p.add_argument("--text-kb", type=int, default=64, help="size of each Gutenberg full text")
+    p.add_argument("--api-rate", type=float, default=200.0, help="summarizer token-bucket rate")
+    p.add_argument("--render-seconds", type=float, default=0.5)
+    p.add_argument("--render-concurrency", type=int, default=16)
+    p.add_argument("--out", help="results file (default: benchmarks/results/bench-<time>.json)")
+    p.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.one:
+        with open(args.out, "w") as f:
+            json.dump(run_one(args.one, args), f)
+        return
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    passthrough = [a for i, a in enumerate(argv)
+                   if not (a.startswith("--out") or (i and argv[i - 1] == "--out"))]
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            out = tmp.name
+        subprocess.run([sys.executable, os.path.abspath(__file__), *passthrough,
+                        "--one", str(size), "--out", out], check=True)
+        with open(out) as f:
+            runs.append(json.load(f))
+        os.remove(out)
+
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_rev":   rev,
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "cpus":      os.cpu_count(),
+            "settings":  {k: v for k, v in vars(args).items() if k not in ("one", "out")},
+        },
+        "runs": runs,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'books':>6} {'stage':<10} {'sec':>8} {'items/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>7}")
+    for run in runs:
+        for stage, r in run["stages"].items():
+            print(f"{run['books']:>6} {stage:<10} {r['seconds']:>8.2f} {r['throughput'] or 0:>9.1f} "
+                  f"{r['p50_ms'] or 0:>8.1f} {r['p95_ms'] or 0:>8.1f} {r['peak_rss_mb']:>7.1f}")
+    print(f"[INFO] Results written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Replay server for the benchmarks: OpenLibrary, Gutendex, Gutenberg, Cohere,
+TTS and the render API on one local port.
+
+Responses follow the shape of the real services' payloads and are generated
+deterministically from a seed, so every run replays the same corpus.  Each
+request can be delayed (`latency` ± `jitter` seconds) and the Cohere
+endpoint answers a fraction `throttle` of calls with 429 + Retry-After.
+"""
+
+import io
+import json
+import time
+import random
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from render_stub import RenderStubHandler, ThreadingHTTPServer
+
+WORDS = ("focus habit time work deep attention goal plan energy task system "
+         "routine mind practice progress effort clarity priority rest").split()
+
+# ——————————————————————————————————————————————————————————————
+# Deterministic corpus
+# ——————————————————————————————————————————————————————————————
+def paragraph(rng: random.Random, sentences: int) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+        out.append(" ".join(words).capitalize() + rng.choice(".!?"))
+    # hard-wrap like Gutenberg plain-text files
+    text, lines, line = " ".join(out), [], ""
+    for word in text.split():
+        if len(line) + len(word) > 70:
+            lines.append(line)
+            line = ""
+        line = f"{line} {word}".strip()
+    return "\n".join(lines + [line])
+
+def gutenberg_text(book_id: int, size: int) -> str:
+    rng = random.Random(book_id)
+    title = f"The {rng.choice(WORDS).title()} Book {book_id}"
+    head = (f"The Project Gutenberg eBook of {title}\n\nThis eBook is for the use of anyone "
+            f"anywhere...\n\n*** START OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\n")
+    foot = (f"\n\n*** END OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\n"
+            "Updated editions will replace the previous one...\n")
+    parts, total = [head], len(head)
+    while total < size:
+        para = paragraph(rng, rng.randint(2, 8))
+        parts.append(para + "\n\n")
+        total += len(para) + 2
+    parts.append(foot)
+    return "".join(parts)
+
+def ol_works(subject: str, limit: int) -> list:
+    return [{"key": f"/works/OL{i}W", "title": f"{subject.title()} Work {i}",
+             "authors": [{"name": f"Author {i % 97}"}]} for i in range(limit)]
+
+def ol_detail(work_id: str) -> dict:
+    rng = random.Random(work_id)
+    return {"key": f"/works/{work_id}", "title": f"Work {work_id}",
+            "description": {"type": "/type/text", "value": paragraph(rng, 12)},
+            "authors": [{"author": {"key": f"/authors/OL{rng.randint(1, 999)}A"}}]}
+
+GUTENDEX_TOTAL = 2000       # works matching any search
+GUTENDEX_PAGE  = 32         # Gutendex's fixed page size
+
+def gutendex_work(search: str, i: int) -> dict:
+    # every fourth hit is off-topic, the way a free-text search also hits prefaces and letters
+    on_topic = i % 4 != 3
+    return {"id": 1000 + i,
+            "title": f"{search.title()} and Other Essays, Vol. {i}" if on_topic else f"Collected Letters, Vol. {i}",
+            "authors": [{"name": f"Writer {i % 53}"}],
+            "subjects": [f"{search.title()} -- Early works" if on_topic else "Letters"],
+            "bookshelves": [], "languages": ["en"],
+            "download_count": 5000 - i}
+
+def gutendex_results(search: str, limit: int = None, page: int = 1, base: str = "") -> dict:
+    """One result page; `limit` (not a real Gutendex parameter) returns that many at once."""
+    if limit:
+        return {"count": limit, "next": None, "previous": None,
+                "results": [gutendex_work(search, i) for i in range(limit)]}
+    start = (page - 1) * GUTENDEX_PAGE
+    stop  = min(start + GUTENDEX_PAGE, GUTENDEX_TOTAL)
+    more  = stop < GUTENDEX_TOTAL
+    return {"count": GUTENDEX_TOTAL, "previous": None,
+            "next": f"{base}/books/?search={search}&page={page + 1}" if more else None,
+            "results": [gutendex_work(search, i) for i in range(start, stop)]}
+
+# ——————————————————————————————————————————————————————————————
+# Server
+# ——————————————————————————————————————————————————————————————
+class StubServiceHandler(RenderStubHandler):
+    latency  = 0.0
+    jitter   = 0.0
+    throttle = 0.0
+    text_size = 64 * 1024
+    counts   = {}
+    lock     = threading.Lock()
+
+    def _delay(self, endpoint: str):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def _text(self, code, body: bytes, ctype="text/plain; charset=utf-8"):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if parts[0] == "subjects":
+            self._delay("openlibrary_subject")
+            subject = parts[1].removesuffix(".json")
+            return self._json(200, {"name": subject,
+                                    "works": ol_works(subject, int(q.get("limit", ["5"])[0]))})
+        if parts[0] == "works":
+            self._delay("openlibrary_work")
+            return self._json(200, ol_detail(parts[1].removesuffix(".json")))
+        if parts[0] == "books":
+            self._delay("gutendex_search")
+            search = (q.get("search") or q.get("topic") or [""])[0]
+            limit  = int(q["limit"][0]) if "limit" in q else None
+            base   = f"http://{self.headers.get('Host', '')}"
+            return self._json(200, gutendex_results(search, limit, int(q.get("page", ["1"])[0]), base))
+        if parts[0] == "files" and len(parts) == 3 and parts[2].endswith(".txt"):
+            self._delay("gutenberg_text")
+            return self._text(200, gutenberg_text(int(parts[1]), self.text_size).encode("utf-8"))
+        if parts[0] == "tts":
+            self._delay("tts")
+            return self._text(200, b"ID3" + q.get("text", [""])[0].encode("utf-8"), "audio/mpeg")
+        if parts[:2] == ["v1", "renders"] or parts[0] == "files":
+            self._delay("render_poll")
+        return super().do_GET()
+
+    def do_POST(self):
+        if self.path.startswith("/v1/summarize"):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            self._delay("cohere_summarize")
+            if random.random() < self.throttle:
+                self.send_response(429)
+                self.send_header("Retry-After", "0.2")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            sentences = [s.strip() for s in body.get("text", "").split(".") if s.strip()]
+            summary = "\n".join(f"- {s}." for s in sentences[:3])
+            return self._json(200, {"id": "stub", "summary": summary})
+        self._delay("render_start")
+        return super().do_POST()
+
+def start(latency=0.0, jitter=0.0, throttle=0.0, text_size=64 * 1024, render_seconds=0.5):
+    """Start the replay server in the background; returns (server, base URL)."""
+    handler = type("Handler", (StubServiceHandler,), {
+        "latency": latency, "jitter": jitter, "throttle": throttle,
+        "text_size": text_size, "render_seconds": render_seconds,
+        "renders": {}, "counts": {},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+# ——————————————————————————————————————————————————————————————
+# Client stand-ins for the SDKs that cannot be pointed at a URL
+# ——————————————————————————————————————————————————————————————
+class StubApiError(Exception):
+    def __init__(self, status_code, headers):
+        super().__init__(f"status_code: {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+
+class StubCohere:
+    """Minimal cohere.Client replacement that talks to the replay server."""
+
+    def __init__(self, base_url: str):
+        self.url = f"{base_url}/v1/summarize"
+        self.session = requests.Session()
+
+    def summarize(self, text, **params):
+        r = self.session.post(self.url, json={"text": text, **params}, timeout=30)
+        if r.status_code != 200:
+            raise StubApiError(r.status_code, r.headers)
+        return type("SummarizeResponse", (), r.json())
+
+def stub_gtts(base_url: str):
+    """A gTTS-compatible class that fetches its 'audio' from the replay server."""
+    session = requests.Session()
+
+    class StubTTS:
+        def __init__(self, text, lang="en", tld="com"):
+            self.text = text
+
+        def write_to_fp(self, fp: io.BufferedIOBase):
+            r = session.get(f"{base_url}/tts", params={"text": self.text}, timeout=30)
+            r.raise_for_status()
+            fp.write(r.content)
+
+    return StubTTS
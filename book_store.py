@@ -0,0 +1,134 @@
+"""
+Streaming book store.
+
+Book metadata lives in an append-only JSONL file (one record per line) and
+every full text is kept in its own gzip blob under ``data/texts/<id>.txt.gz``.
+Producers append records as they go; consumers iterate them lazily and only
+open a text blob when they actually need it, so memory no longer grows with
+the size of the corpus and a bad write can at most cost the last line.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+
+import metrics
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+DATA_DIR       = "data"
+BOOKS_PATH     = os.path.join(DATA_DIR, "books.jsonl")
+SUMMARIES_PATH = os.path.join(DATA_DIR, "summaries.jsonl")
+TEXT_DIR       = os.path.join(DATA_DIR, "texts")
+READ_CHARS     = 64 * 1024     # characters per chunk when streaming a text
+
+# ——————————————————————————————————————————————————————————————
+# IDs & text blobs
+# ——————————————————————————————————————————————————————————————
+def book_id(book: dict) -> str:
+    """Stable ID from source + title + authors (or the record's own `id`)."""
+    if book.get("id"):
+        return book["id"]
+    key = "|".join([
+        book.get("source", ""),
+        book.get("title", "").strip().lower(),
+        ",".join(a.strip().lower() for a in book.get("authors", [])),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def text_path(bid: str) -> str:
+    return os.path.join(TEXT_DIR, f"{bid}.txt.gz")
+
+def write_text(bid: str, text: str) -> str:
+    path = text_path(bid)
+    os.makedirs(TEXT_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return path
+
+def iter_text(record: dict, chunk_chars: int = READ_CHARS):
+    """Yield a book's full text in pieces without loading it all at once."""
+    if "full_text" in record:                       # legacy inline record
+        text = record.get("full_text") or ""
+        for i in range(0, len(text), chunk_chars):
+            yield text[i:i + chunk_chars]
+        return
+    path = record.get("text_path")
+    if not path or not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        while True:
+            piece = f.read(chunk_chars)
+            if not piece:
+                break
+            yield piece
+
+def load_text(record: dict) -> str:
+    return "".join(iter_text(record))
+
+# ——————————————————————————————————————————————————————————————
+# JSONL records
+# ——————————————————————————————————————————————————————————————
+def iter_records(path: str):
+    """Lazily yield records from a JSONL file (or a legacy JSON array)."""
+    if not os.path.exists(path):
+        return
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[WARN] Skipping corrupt line {lineno} in {path}")
+
+def append_records(path: str, records) -> int:
+    """Append records to a JSONL file, flushing after each one."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count, name = 0, os.path.basename(path)
+    with open(path, "a", encoding="utf-8") as f:
+        for rec in records:
+            t0 = time.perf_counter()
+            line = json.dumps(rec, ensure_ascii=False)
+            metrics.observe("json_serialize", time.perf_counter() - t0, file=name)
+            f.write(line + "\n")
+            f.flush()
+            count += 1
+    return count
+
+def reset(path: str):
+    """Start a fresh, empty JSONL file for this run."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    open(path, "w", encoding="utf-8").close()
+
+# ——————————————————————————————————————————————————————————————
+# Books
+# ——————————————————————————————————————————————————————————————
+def to_record(book: dict) -> dict:
+    """Move `full_text` into its blob and return the slim metadata record."""
+    record = {k: v for k, v in book.items() if k != "full_text"}
+    record["id"] = book_id(book)
+    if "full_text" in book:
+        text = book.get("full_text") or ""
+        record["text_path"]  = write_text(record["id"], text)
+        record["text_chars"] = len(text)
+    return record
+
+def append_books(books, path: str = BOOKS_PATH) -> int:
+    return append_records(path, (to_record(b) for b in books))
+
+def iter_books(path: str = BOOKS_PATH):
+    yield from iter_records(path)
+
+def iter_summaries(path: str = SUMMARIES_PATH):
+    yield from iter_records(path)
@@ -0,0 +1,232 @@
+"""
+Local metadata index of Project Gutenberg works, built from Gutendex.
+
+Every Gutendex listing the fetcher receives is folded into a small SQLite
+database (titles, authors, subjects, bookshelves, languages and download
+counts, no formats or texts) with an FTS5 table on top.  Candidates are
+ranked against the niche here, before any full text is downloaded, and a
+niche searched within CATALOG_TTL is answered from the index without going
+to the network at all.
+
+    python catalog.py productivity habits     # top works per niche, from the index
+    python catalog.py --stats
+"""
+
+import os
+import re
+import sys
+import math
+import time
+import sqlite3
+import threading
+
+import book_store
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+CATALOG_PATH      = os.path.join(book_store.DATA_DIR, "catalog.sqlite")
+CATALOG_TTL       = 7 * 24 * 3600   # re-search a niche on Gutendex after this (seconds)
+CATALOG_PAGES     = 2               # Gutendex result pages (32 works each) per search
+LANGUAGES         = ("en",)         # works in other languages are never ranked
+FIELD_WEIGHTS     = {"title": 8.0, "subjects": 4.0, "bookshelves": 2.0, "authors": 1.0}
+POPULARITY_WEIGHT = 0.5             # score bonus per tenfold downloads / editions
+RANK_POOL         = 10              # FTS matches re-ranked per requested result
+
+_FIELDS = tuple(FIELD_WEIGHTS)
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS works (
+    id             INTEGER PRIMARY KEY,
+    title          TEXT NOT NULL,
+    authors        TEXT NOT NULL,
+    subjects       TEXT NOT NULL,
+    bookshelves    TEXT NOT NULL,
+    languages      TEXT NOT NULL,
+    download_count INTEGER NOT NULL DEFAULT 0,
+    updated        REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
+    {", ".join(_FIELDS)}, content='works', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS works_ai AFTER INSERT ON works BEGIN
+    INSERT INTO works_fts(rowid, {", ".join(_FIELDS)})
+    VALUES (new.id, {", ".join("new." + f for f in _FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS works_ad AFTER DELETE ON works BEGIN
+    INSERT INTO works_fts(works_fts, rowid, {", ".join(_FIELDS)})
+    VALUES ('delete', old.id, {", ".join("old." + f for f in _FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS works_au AFTER UPDATE ON works BEGIN
+    INSERT INTO works_fts(works_fts, rowid, {", ".join(_FIELDS)})
+    VALUES ('delete', old.id, {", ".join("old." + f for f in _FIELDS)});
+    INSERT INTO works_fts(rowid, {", ".join(_FIELDS)})
+    VALUES (new.id, {", ".join("new." + f for f in _FIELDS)});
+END;
+CREATE TABLE IF NOT EXISTS searches (
+    query   TEXT PRIMARY KEY,
+    fetched REAL NOT NULL,
+    works   INTEGER NOT NULL
+);
+"""
+_SEP = "\n"                 # list fields are stored one entry per line
+
+_lock = threading.RLock()
+_conn = None                # opened on first use so importing creates nothing
+
+# ——————————————————————————————————————————————————————————————
+# Database
+# ——————————————————————————————————————————————————————————————
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CATALOG_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CATALOG_PATH, check_same_thread=False, timeout=30)
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+def _query_key(niche: str) -> str:
+    return " ".join(terms(niche))
+
+def terms(text: str) -> list:
+    """Lower-case word tokens of a niche or title (FTS operators stripped)."""
+    return re.findall(r"\w+", text.lower())
+
+# ——————————————————————————————————————————————————————————————
+# Building the index
+# ——————————————————————————————————————————————————————————————
+def _row(item: dict, now: float) -> tuple:
+    authors = [a.get("name", "") if isinstance(a, dict) else str(a) for a in item.get("authors", [])]
+    return (int(item["id"]), item.get("title") or "", _SEP.join(filter(None, authors)),
+            _SEP.join(item.get("subjects") or []), _SEP.join(item.get("bookshelves") or []),
+            ",".join(item.get("languages") or []), int(item.get("download_count") or 0), now)
+
+def ingest(items, query: str = None) -> int:
+    """Upsert Gutendex `results` entries; with `query`, remember it was searched.
+
+    Returns the number of works written.
+    """
+    now  = time.time()
+    rows = [_row(item, now) for item in items if item.get("id") is not None]
+    with _lock:
+        db = _db()
+        with db:
+            db.executemany(
+                "INSERT INTO works (id, title, authors, subjects, bookshelves, languages,"
+                " download_count, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET title=excluded.title, authors=excluded.authors,"
+                " subjects=excluded.subjects, bookshelves=excluded.bookshelves,"
+                " languages=excluded.languages, download_count=excluded.download_count,"
+                " updated=excluded.updated", rows)
+            if query is not None:
+                db.execute("INSERT OR REPLACE INTO searches (query, fetched, works) VALUES (?, ?, ?)",
+                           (_query_key(query), now, len(rows)))
+    return len(rows)
+
+def is_fresh(niche: str) -> bool:
+    """True when `niche` was searched on Gutendex within CATALOG_TTL."""
+    with _lock:
+        row = _db().execute("SELECT fetched FROM searches WHERE query = ?",
+                            (_query_key(niche),)).fetchone()
+    return bool(row) and time.time() - row[0] < CATALOG_TTL
+
+# ——————————————————————————————————————————————————————————————
+# Ranking
+# ——————————————————————————————————————————————————————————————
+def popularity(count) -> float:
+    return POPULARITY_WEIGHT * math.log10(1 + max(int(count or 0), 0))
+
+def _match(words: list, any_term: bool) -> str:
+    return (" OR " if any_term else " ").join(f'"{w}"' for w in words)
+
+def _item(row) -> dict:
+    """A catalog row in the shape of a Gutendex `results` entry."""
+    wid, title, authors, subjects, shelves, languages, downloads, relevance = row
+    return {
+        "id":             wid,
+        "title":          title,
+        "authors":        [{"name": a} for a in authors.split(_SEP) if a],
+        "subjects":       [s for s in subjects.split(_SEP) if s],
+        "bookshelves":    [s for s in shelves.split(_SEP) if s],
+        "languages":      [l for l in languages.split(",") if l],
+        "download_count": downloads,
+        "relevance":      relevance,
+    }
+
+def rank(niche: str, limit: int = 5, languages=None) -> list:
+    """The `limit` works that best fit `niche`, best first, from the index only.
+
+    Relevance is FTS5 bm25 over title, subjects, bookshelves and authors
+    (weighted by FIELD_WEIGHTS) plus a log-scaled download-count bonus.
+    All niche words must match; when that leaves too few works, any word
+    will do.
+    """
+    words = terms(niche)
+    if not words or limit <= 0:
+        return []
+    languages = LANGUAGES if languages is None else languages
+    weights = ", ".join(str(FIELD_WEIGHTS[f]) for f in _FIELDS)
+    sql = ("SELECT w.id, w.title, w.authors, w.subjects, w.bookshelves, w.languages,"
+           f" w.download_count, -bm25(works_fts, {weights}) AS rel"
+           " FROM works_fts JOIN works w ON w.id = works_fts.rowid"
+           " WHERE works_fts MATCH ? ORDER BY rel DESC LIMIT ?")
+    ranked, seen = [], set()
+    for any_term in (False, True) if len(words) > 1 else (False,):
+        with _lock:
+            rows = _db().execute(sql, (_match(words, any_term), limit * RANK_POOL)).fetchall()
+        pool = []
+        for row in rows:
+            item = _item(row)
+            if item["id"] in seen:
+                continue
+            if languages and item["languages"] and not set(item["languages"]) & set(languages):
+                continue
+            item["relevance"] = round(item["relevance"] + popularity(item["download_count"]), 3)
+            pool.append(item)
+        pool.sort(key=lambda i: i["relevance"], reverse=True)
+        ranked += pool[:limit - len(ranked)]
+        seen.update(i["id"] for i in ranked)
+        if len(ranked) >= limit:
+            break
+    return ranked
+
+def score_listing(niche: str, title: str, subjects=(), popularity_count=0) -> float:
+    """Rough relevance of a listing entry that is not in the index (OpenLibrary).
+
+    Shares of niche words found in the title and subjects, weighted like the
+    FTS fields, plus the same popularity bonus.
+    """
+    words = set(terms(niche))
+    if not words:
+        return 0.0
+    title_hits   = len(words & set(terms(title)))
+    subject_hits = len(words & set(terms(" ".join(subjects))))
+    return (FIELD_WEIGHTS["title"] * title_hits / len(words)
+            + FIELD_WEIGHTS["subjects"] * subject_hits / len(words)
+            + popularity(popularity_count))
+
+def stats() -> dict:
+    with _lock:
+        db = _db()
+        works    = db.execute("SELECT COUNT(*) FROM works").fetchone()[0]
+        searches = db.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+    size = os.path.getsize(CATALOG_PATH) if os.path.exists(CATALOG_PATH) else 0
+    return {"works": works, "searches": searches, "bytes": size}
+
+if __name__ == "__main__":
+    if "--stats" in sys.argv:
+        s = stats()
+        print(f"[INFO] Catalog {CATALOG_PATH} → {s['works']} works, {s['searches']} searches, "
+              f"{s['bytes'] / 2**20:.1f} MB")
+    for niche in [a for a in sys.argv[1:] if not a.startswith("--")]:
+        print(f"[INFO] `{niche}`{'' if is_fresh(niche) else ' (stale – run a fetch to refresh)'}")
+        for item in rank(niche, 10):
+            print(f"  {item['relevance']:7.2f}  #{item['id']:<6} {item['title'][:70]}")
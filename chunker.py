@@ -0,0 +1,175 @@
+"""
+Single-pass text chunker for the summarizer.
+
+Everything here works on an iterable of text pieces (e.g. the generator
+returned by ``book_store.iter_text``) and yields results as it goes, so a
+book is never fully materialised in memory:
+
+    pieces → iter_lines → strip_gutenberg_boilerplate → iter_paragraphs
+           → iter_chunks (paragraph / sentence packing up to max_chars)
+"""
+
+import re
+
+# ——————————————————————————————————————————————————————————————
+# Configuration
+# ——————————————————————————————————————————————————————————————
+CHUNK_CHARS       = 20_000     # target upper bound per chunk
+MIN_CHUNK_CHARS   = 250        # shorter tails are merged into the previous chunk
+HEADER_SCAN_LINES = 1_000      # give up looking for a START marker after this
+
+START_MARKER = re.compile(
+    r"^\s*\*{3}\s*START OF (THE|THIS) PROJECT GUTENBERG E-?BOOK"
+    r"|^\s*\*END\*THE SMALL PRINT", re.I)
+END_MARKER = re.compile(
+    r"^\s*\*{3}\s*END OF (THE|THIS) PROJECT GUTENBERG E-?BOOK"
+    r"|^\s*End of (the )?Project Gutenberg'?s? E-?Book", re.I)
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+")
+
+# ——————————————————————————————————————————————————————————————
+# Line / paragraph streams
+# ——————————————————————————————————————————————————————————————
+def _as_pieces(text):
+    return [text] if isinstance(text, str) else text
+
+def iter_lines(pieces):
+    """Re-cut arbitrary text pieces into lines (without the newline)."""
+    partial = []                       # pieces of the current, unfinished line
+    for piece in _as_pieces(pieces):
+        piece = piece.replace("\r", "")
+        if "\n" not in piece:
+            partial.append(piece)
+            continue
+        lines = piece.split("\n")
+        partial.append(lines[0])
+        yield "".join(partial)
+        yield from lines[1:-1]
+        partial = [lines[-1]]
+    if "".join(partial):
+        yield "".join(partial)
+
+def strip_gutenberg_boilerplate(lines):
+    """Drop the Project Gutenberg licence header and footer from a line stream.
+
+    Lines before a START marker are held back (up to HEADER_SCAN_LINES); if no
+    marker shows up they are released unchanged, so non-Gutenberg texts pass
+    straight through.  Everything from the END marker on is discarded.
+    """
+    held = []
+    started = False
+    for line in lines:
+        if not started:
+            if START_MARKER.match(line):
+                started, held = True, []
+                continue
+            held.append(line)
+            if len(held) < HEADER_SCAN_LINES:
+                continue
+            started = True
+            yield from held
+            held = []
+            continue
+        if END_MARKER.match(line):
+            return
+        yield line
+    for line in held:                  # short text without any START marker
+        if END_MARKER.match(line):
+            return
+        yield line
+
+def iter_paragraphs(lines):
+    """Join hard-wrapped lines; blank lines separate paragraphs."""
+    para = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            para.append(line)
+        elif para:
+            yield " ".join(para)
+            para = []
+    if para:
+        yield " ".join(para)
+
+def _split_long(paragraph: str, max_chars: int):
+    """Break an oversize paragraph on sentence ends, then on words."""
+    for sentence in SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            yield sentence[:cut]
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            yield sentence
+
+# ——————————————————————————————————————————————————————————————
+# Chunks
+# ——————————————————————————————————————————————————————————————
+def iter_chunks(text, max_chars=CHUNK_CHARS, min_len=MIN_CHUNK_CHARS, strip_boilerplate=True):
+    """Yield chunks of at most ~max_chars covering the whole text.
+
+    `text` may be a string or any iterable of string pieces.  Units
+    (paragraphs, or sentences of oversize paragraphs) are packed greedily;
+    a final chunk shorter than `min_len` is merged into the previous one.
+    Yields nothing when the whole text is shorter than `min_len`.
+    """
+    lines = iter_lines(text)
+    if strip_boilerplate:
+        lines = strip_gutenberg_boilerplate(lines)
+
+    ready = None          # completed chunk, held back so a short tail can merge
+    units, size = [], 0
+    for para in iter_paragraphs(lines):
+        pieces = [para] if len(para) <= max_chars else _split_long(para, max_chars)
+        for unit in pieces:
+            if units and size + len(unit) > max_chars:
+                if ready is not None:
+                    yield ready
+                ready = "\n\n".join(units)
+                units, size = [], 0
+            units.append(unit)
+            size += len(unit) + 2
+
+    tail = "\n\n".join(units)
+    if ready is not None and len(tail) < min_len:
+        ready = f"{ready}\n\n{tail}" if tail else ready
+        tail = ""
+    if ready is not None:
+        yield ready
+    if tail and (ready is not None or len(tail) >= min_len):
+        yield tail
+
+def sample_indices(n: int, k: int) -> list:
+    """k evenly spaced indices into n items, always including the first and last.
+
+    >>> sample_indices(100, 5)
+    [0, 25, 50, 74, 99]
+    >>> sample_indices(11, 5)
+    [0, 2, 5, 8, 10]
+    >>> sample_indices(3, 5)
+    [0, 1, 2]
+    """
+    if k <= 0 or n <= 0:
+        return []
+    if n <= k:
+        return list(range(n))
+    if k == 1:
+        return [0]
+    return sorted({round(i * (n - 1) / (k - 1)) for i in range(k)})
+
+def sample_chunks(chunks, k: int, total: int = None):
+    """Keep k evenly spaced chunks, first and last included, order preserved.
+
+    With `total` (the number of chunks, e.g. from a counting pass over the
+    same text) the stream is consumed in O(k) memory; otherwise it is
+    materialised to learn its length.
+
+    >>> sample_chunks(range(100), 5)
+    [0, 25, 50, 74, 99]
+    >>> sample_chunks(iter(range(100)), 5, total=100)[-1]
+    99
+    """
+    if total is None:
+        chunks = chunks if hasattr(chunks, "__len__") else list(chunks)
+        total = len(chunks)
+    wanted = set(sample_indices(total, k))
+    return [chunk for i, chunk in enumerate(chunks) if i in wanted]
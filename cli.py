@@ -0,0 +1,259 @@
+"""
+One command line for the whole pipeline and each of its stages.
+
+    python cli.py all --niche productivity --per-source 5
+    python cli.py all --stream --niche habits --stage-workers summarize=4,voice=8
+    python cli.py batch --niches "productivity,habits,stoicism" --per-source 10 \\
+                        --fetch-workers 16 --http-concurrency 8 --api-rate 5 --max-memory 2048
+    python cli.py fetch --niche productivity
+    python cli.py summarize --summarizer extractive --summary-workers 4
+    python cli.py voice --voice-workers 16
+    python cli.py video --render-concurrency 8
+
+Every option overrides the matching module-level setting before the stage
+runs, so the same code can be tuned for a laptop run or a large nightly
+batch.  ``--metrics PATH``, ``--profile`` and ``--tracemalloc`` work on every
+subcommand (see metrics.py).
+"""
+
+import os
+import sys
+import argparse
+
+import metrics
+
+# rough resident-memory costs used to fit --max-memory (MB)
+BASE_MB            = 150      # interpreter, HTTP pools, caches' indexes
+FETCH_WORKER_MB    = 2.0      # one full text being downloaded and stored
+CHUNK_IN_FLIGHT_MB = 0.5      # one summary worker: its chunk, request and reply
+BOOK_IN_FLIGHT_MB  = 1.0      # one book's chunk window + summaries held by summarize / pipeline
+VOICE_WORKER_MB    = 1.0      # one TTS request's text and audio
+SUMMARY_ENTRY_KB   = 1.0      # one memoised chunk summary
+LOCAL_MODEL_MB     = 1500     # distilbart weights + activations for one batch
+RENDER_PROCESS_MB  = {"final": 500, "draft": 150}
+MAX_SCALE          = 4        # --max-memory raises a setting to at most this × its default
+
+# ——————————————————————————————————————————————————————————————
+# Options
+# ——————————————————————————————————————————————————————————————
+def _niches(args) -> list:
+    niches = [n.strip() for value in (args.niche or []) + (args.niches or [])
+              for n in value.split(",") if n.strip()]
+    if args.niches_file:
+        with open(args.niches_file, encoding="utf-8") as f:
+            niches += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(niches)) or ["productivity"]
+
+def _stage_workers(value: str) -> dict:
+    """`summarize=4,voice=8` → {"summarize": 4, "voice": 8} (streaming pipeline stages)."""
+    import pipeline
+    workers = {}
+    for item in filter(None, (v.strip() for v in value.split(","))):
+        stage, _, count = item.partition("=")
+        if stage not in pipeline.STAGE_WORKERS or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(
+                f"expected STAGE=N with STAGE in {', '.join(pipeline.STAGE_WORKERS)}, got `{item}`")
+        workers[stage] = int(count)
+    return workers
+
+def _options() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    g = common.add_argument_group("books")
+    g.add_argument("--niche", action="append", help="niche to fetch (repeatable, or comma-separated)")
+    g.add_argument("--niches", action="append", help="comma-separated niche list")
+    g.add_argument("--niches-file", help="file with one niche per line")
+    g.add_argument("--per-source", type=int, default=5, help="books per source per niche (default 5)")
+    g.add_argument("--text-chars", type=int, help="stream only this many characters of each full text")
+    g.add_argument("--force", action="store_true", help="ignore the stage manifest and redo everything")
+
+    g = common.add_argument_group("workers & rates")
+    g.add_argument("--fetch-workers", type=int, help="threads downloading details / full texts")
+    g.add_argument("--niche-workers", type=int, help="niche listings requested at once (batch)")
+    g.add_argument("--http-concurrency", type=int, help="max in-flight requests per host")
+    g.add_argument("--summary-workers", type=int, help="chunks summarized at once")
+    g.add_argument("--api-rate", type=float, help="Cohere calls per second")
+    g.add_argument("--summarizer", choices=["cohere", "transformers", "extractive"],
+                   help="summarization backend")
+    g.add_argument("--summary-threads", type=int, help="torch threads for --summarizer transformers")
+    g.add_argument("--voice-workers", type=int, help="concurrent TTS requests")
+    g.add_argument("--stage-workers", type=_stage_workers, action="append", metavar="STAGE=N,…",
+                   help="books in flight per stage with --stream (fetch, summarize, voice, video)")
+    g.add_argument("--render-concurrency", type=int, help="Creatomate renders in flight")
+    g.add_argument("--render-processes", type=int, help="local compositor processes")
+    g.add_argument("--video-backend", choices=["creatomate", "local"])
+    g.add_argument("--video-preset", choices=["final", "draft"])
+
+    g = common.add_argument_group("caches & resources")
+    g.add_argument("--cache-dir", help="root for the HTTP, summary, TTS segment and catalog caches "
+                                       "(default data/ + voices/segments/)")
+    g.add_argument("--no-http-cache", action="store_true", help="always hit the network")
+    g.add_argument("--no-catalog", action="store_true",
+                   help="skip the local Gutenberg catalog; filter a plain search instead")
+    g.add_argument("--catalog-ttl", type=float, metavar="DAYS",
+                   help="re-search a niche on Gutendex after this many days (default 7)")
+    g.add_argument("--max-memory", type=int, metavar="MB",
+                   help="size worker pools, buffers and process pools to fit this budget "
+                        "(explicit worker options win)")
+
+    g = common.add_argument_group("instrumentation")
+    g.add_argument("--metrics", metavar="PATH", help="export metrics (.jsonl or .prom)")
+    g.add_argument("--profile", action="store_true", help="run under cProfile")
+    g.add_argument("--tracemalloc", action="store_true", help="report allocation hot spots")
+
+    p = argparse.ArgumentParser(prog="cli.py", description=__doc__.split("\n\n")[0])
+    sub = p.add_subparsers(dest="command", required=True)
+    sub.add_parser("all", parents=[common], help="fetch → summarize → voice → video") \
+       .add_argument("--stream", action="store_true", help="push each book through every stage as it arrives")
+    sub.add_parser("batch", parents=[common], help="all stages for many niches, each book once")
+    sub.add_parser("automate", parents=[common], help="batch over the openings of each book (3000 chars)")
+    sub.add_parser("fetch", parents=[common], help="fetch books only")
+    sub.add_parser("summarize", parents=[common], help="summarize stored books")
+    sub.add_parser("voice", parents=[common], help="voice stored summaries")
+    sub.add_parser("video", parents=[common], help="render Reels for stored summaries")
+    return p
+
+# ——————————————————————————————————————————————————————————————
+# Applying settings
+# ——————————————————————————————————————————————————————————————
+def _set(module, name, value):
+    if value is not None:
+        setattr(module, name, value)
+
+def configure(args):
+    """Push the command-line settings into the stage modules."""
+    import asset_store, fetch_books, batch, catalog, http_cache, pipeline, summary_cache, summarize
+    import voice_generator, video_generator, local_renderer
+
+    _set(fetch_books, "FETCH_WORKERS", args.fetch_workers)
+    _set(fetch_books, "TEXT_MAX_CHARS", args.text_chars)
+    _set(batch, "NICHE_WORKERS", args.niche_workers)
+    if args.http_concurrency:
+        fetch_books.DEFAULT_HOST_LIMIT = args.http_concurrency
+        fetch_books.HOST_LIMITS = {host: args.http_concurrency for host in fetch_books.HOST_LIMITS}
+    if args.no_http_cache:
+        fetch_books.USE_HTTP_CACHE = False
+    if args.no_catalog:
+        fetch_books.USE_CATALOG = False
+    if args.catalog_ttl is not None:
+        catalog.CATALOG_TTL = args.catalog_ttl * 24 * 3600
+
+    _set(summarize, "SUMMARY_WORKERS", args.summary_workers)
+    _set(summarize, "API_RATE", args.api_rate)
+    _set(summarize, "SUMMARY_BACKEND", args.summarizer)
+    _set(summarize, "LOCAL_THREADS", args.summary_threads)
+    _set(voice_generator, "VOICE_WORKERS", args.voice_workers)
+    _set(video_generator, "RENDER_CONCURRENCY", args.render_concurrency)
+    _set(video_generator, "VIDEO_BACKEND", args.video_backend)
+    _set(video_generator, "VIDEO_PRESET", args.video_preset)
+    _set(local_renderer, "RENDER_PROCESSES", args.render_processes)
+    for workers in args.stage_workers or []:
+        pipeline.STAGE_WORKERS.update(workers)
+
+    if args.cache_dir:
+        http_cache.CACHE_DIR = os.path.join(args.cache_dir, "http_cache")
+        summary_cache.CACHE_PATH = os.path.join(args.cache_dir, "summary_cache.json")
+        asset_store.KINDS["segment"] = (os.path.join(args.cache_dir, "tts_segments"),
+                                        *asset_store.KINDS["segment"][1:])
+        catalog.CATALOG_PATH = os.path.join(args.cache_dir, "catalog.sqlite")
+    if args.max_memory:
+        explicit = {"FETCH_WORKERS": args.fetch_workers, "SUMMARY_WORKERS": args.summary_workers,
+                    "VOICE_WORKERS": args.voice_workers, "RENDER_PROCESSES": args.render_processes}
+        apply_memory_budget(args.max_memory, keep={k for k, v in explicit.items() if v is not None})
+
+def _fit(current: int, share: float, unit_mb: float, floor: int = 1) -> int:
+    """How many `unit_mb` items fit in `share` MB, kept within [floor, MAX_SCALE × current]."""
+    return max(floor, min(int(share // unit_mb), current * MAX_SCALE))
+
+def apply_memory_budget(mb: int, keep=()):
+    """Size worker pools, buffers and process pools so a run stays near `mb` MB resident.
+
+    What is left after the baseline (and the local model) is split between
+    fetch workers, chunks being summarized, books in flight / voice workers
+    and the summary memo; each setting is raised or lowered to fit its
+    share, up to MAX_SCALE × its current value.  Local render processes are
+    only ever lowered (they are CPU-bound), and settings named in `keep`
+    (given explicitly on the command line) are left alone.
+    """
+    import fetch_books, pipeline, summarize, summary_cache, voice_generator
+    import video_generator, local_renderer
+
+    free = mb - BASE_MB
+    if summarize.SUMMARY_BACKEND == "transformers":
+        free -= LOCAL_MODEL_MB
+    if free <= 0:
+        print(f"[WARN] --max-memory {mb} MB is below the ~{mb - free} MB baseline; using minimal buffers")
+        free = 1
+
+    if video_generator.VIDEO_BACKEND == "local" and "RENDER_PROCESSES" not in keep:
+        per_render = RENDER_PROCESS_MB[video_generator.VIDEO_PRESET]
+        local_renderer.RENDER_PROCESSES = max(1, min(local_renderer.RENDER_PROCESSES,
+                                                     int(free * 0.5 // per_render)))
+        free -= local_renderer.RENDER_PROCESSES * per_render
+
+    share = max(free, 1) / 4          # fetch, summarize, books in flight and memo each get a share
+    settings = [
+        (fetch_books,     "FETCH_WORKERS",   share,     FETCH_WORKER_MB,          1),
+        (summarize,       "SUMMARY_WORKERS", share,     CHUNK_IN_FLIGHT_MB,       1),
+        (summarize,       "BOOKS_IN_FLIGHT", share / 2, BOOK_IN_FLIGHT_MB,        1),
+        (pipeline,        "QUEUE_SIZE",      share / 4, BOOK_IN_FLIGHT_MB,        1),
+        (voice_generator, "VOICE_WORKERS",   share / 4, VOICE_WORKER_MB,          1),
+        (summary_cache,   "MAX_ENTRIES",     share,     SUMMARY_ENTRY_KB / 1024,  1_000),
+    ]
+    for module, name, budget, unit_mb, floor in settings:
+        if name not in keep:
+            setattr(module, name, _fit(getattr(module, name), budget, unit_mb, floor))
+    print(f"[INFO] Memory budget {mb} MB → fetch workers={fetch_books.FETCH_WORKERS}, "
+          f"summary workers={summarize.SUMMARY_WORKERS}, books in flight={summarize.BOOKS_IN_FLIGHT}, "
+          f"queue size={pipeline.QUEUE_SIZE}, voice workers={voice_generator.VOICE_WORKERS}, "
+          f"summary memo={summary_cache.MAX_ENTRIES}, render processes={local_renderer.RENDER_PROCESSES}")
+
+# ——————————————————————————————————————————————————————————————
+# Commands
+# ——————————————————————————————————————————————————————————————
+def run(args):
+    niches = _niches(args)
+    if args.command == "all":
+        if len(niches) > 1:
+            import batch
+            return batch.run_batch(niches, args.per_source, force=args.force)
+        import generate_all
+        return generate_all.main(niches[0], args.per_source, force=args.force, stream=args.stream,
+                                 workers=args.fetch_workers)
+    if args.command == "batch":
+        import batch
+        return batch.run_batch(niches, args.per_source, force=args.force, max_chars=args.text_chars)
+    if args.command == "automate":
+        import automate
+        return automate.automate(niches, max_books=args.per_source)
+    if args.command == "fetch":
+        if len(niches) > 1:
+            import batch
+            return batch.fetch_niches(niches, args.per_source, max_chars=args.text_chars)
+        import fetch_books
+        return fetch_books.fetch_books(niches[0], args.per_source, concurrent=True,
+                                       workers=args.fetch_workers)
+
+    import manifest
+    if args.force:
+        manifest.clear()
+    if args.command == "summarize":
+        import summarize
+        return summarize.summarize_books()
+    if args.command == "voice":
+        import voice_generator
+        return voice_generator.generate_voices()
+    if args.command == "video":
+        import video_generator
+        return video_generator.generate_videos()
+
+def main(argv=None):
+    parser = _options()
+    args = parser.parse_args(argv)
+    if getattr(args, "stream", False) and len(_niches(args)) > 1:
+        parser.error("--stream runs a single niche; use `batch` for several niches")
+    configure(args)
+    with metrics.instrumented(f"cli-{args.command}", sys.argv[1:] if argv is None else argv):
+        run(args)
+
+if __name__ == "__main__":
+    main()
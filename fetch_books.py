@@ -1,22 +1,107 @@
 import os
-import subprocess
-import json
+import math
+import codecs
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, quote
+
+import http_cache
+import book_store
+import catalog
+import chunker
+import metrics
 
 # ——————————————————————————————————————————————————————————————
-# Ensure requests is installed
+# Configuration & Paths
 # ——————————————————————————————————————————————————————————————
-try:
-    import requests
-except ImportError:
-    print("[WARN] `requests` not found. Installing…")
-    subprocess.check_call(["pip", "install", "requests"])
-    import requests
+DATA_DIR   = book_store.DATA_DIR
+BOOK_PATH  = book_store.BOOKS_PATH          # JSONL records, texts in data/texts/
+
+# upstream base URLs (overridable, e.g. to point the benchmarks at a stub server)
+OPENLIBRARY_URL = os.getenv("OPENLIBRARY_URL", "https://openlibrary.org")
+GUTENDEX_URL    = os.getenv("GUTENDEX_URL",    "https://gutendex.com")
+GUTENBERG_URL   = os.getenv("GUTENBERG_URL",   "https://www.gutenberg.org")
+
+HTTP_TIMEOUT       = 30      # seconds per request
+TEXT_MAX_CHARS     = None    # stream only this much of each Gutenberg text (None = whole book)
+TEXT_HEADER_BYTES  = 64 * 1024   # Range allowance for the licence header when streaming
+# Gutenberg file layouts, tried in order: (file name, encoding when the server sends none)
+GUTENBERG_TEXT_PATTERNS = [
+    ("{bid}-0.txt", "utf-8"),
+    ("{bid}.txt",   "utf-8"),
+    ("{bid}-8.txt", "latin-1"),
+]
+USE_HTTP_CACHE     = True    # serve repeat lookups from data/http_cache/
+USE_CATALOG        = True    # rank Gutenberg works in data/catalog.sqlite (see catalog.py)
+SEARCH_OVERFETCH   = 3       # listing entries ranked for every book kept
+GUTENDEX_PAGE_SIZE = 32      # works per Gutendex result page
+FETCH_WORKERS      = 8       # threads used for detail / full-text downloads
+DEFAULT_HOST_LIMIT = 4       # max in-flight requests for hosts not listed below
+HOST_LIMITS        = {
+    "openlibrary.org":   8,
+    "gutendex.com":      4,
+    "www.gutenberg.org": 4,
+}
 
 # ——————————————————————————————————————————————————————————————
-# Configuration & Paths
+# Shared HTTP session (keep-alive pool + per-host concurrency caps)
 # ——————————————————————————————————————————————————————————————
-DATA_DIR   = "data"
-BOOK_PATH  = os.path.join(DATA_DIR, "books.json")
+_session      = None
+_session_lock = threading.Lock()
+_host_slots   = {}
+
+def get_session() -> "requests.Session":
+    """One pooled Session for every fetch, so connections are reused across calls."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests                   # imported on first use to keep startup fast
+            pool_size = max([DEFAULT_HOST_LIMIT, *HOST_LIMITS.values()])
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=len(HOST_LIMITS) + 1,
+                pool_maxsize=pool_size,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc
+    with _session_lock:
+        if host not in _host_slots:
+            limit = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+            _host_slots[host] = threading.BoundedSemaphore(limit)
+        return _host_slots[host]
+
+def _session_get(url: str, **kwargs):
+    host = urlparse(url).netloc
+    with _host_slot(url), metrics.span("http_request", host=host):
+        r = get_session().get(url, **kwargs)
+    if not kwargs.get("stream"):
+        metrics.incr("bytes_downloaded", len(r.content), host=host)
+    return r
+
+def http_get(url: str, use_cache=None, **kwargs):
+    """GET through the shared session, waiting for a free slot on the target host.
+
+    Unless disabled, the on-disk HTTP cache answers fresh repeats and
+    revalidates stale ones, so a warm re-run barely touches the network.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    if USE_HTTP_CACHE if use_cache is None else use_cache:
+        return http_cache.cached_get(url, _session_get, **kwargs)
+    return _session_get(url, **kwargs)
+
+def parallel_map(fn, items, workers=1):
+    """Order-preserving map; runs inline when workers <= 1."""
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(fn, items))
 
 # ——————————————————————————————————————————————————————————————
 # Helper: sanitize file/URL keys
@@ -28,70 +113,210 @@ def clean_subject(niche: str) -> str:
 # ——————————————————————————————————————————————————————————————
 # 1) OpenLibrary: use the Subjects API for true niche relevance
 # ——————————————————————————————————————————————————————————————
-def fetch_from_openlibrary(niche="productivity", max_results=5):
+def _fetch_ol_work(entry):
+    key = entry.get("key", "")
+    if not key.startswith("/works/"):
+        return None
+    detail_url = f"{OPENLIBRARY_URL}{key}.json"
+
+    try:
+        dr = http_get(detail_url)
+        dr.raise_for_status()
+        data = dr.json()
+    except Exception as e:
+        print(f"[WARN] Failed to fetch work details {key}: {e}")
+        return None
+
+    desc = data.get("description", "No full text available.")
+    if isinstance(desc, dict):
+        desc = desc.get("value", desc)
+
+    # authors: look inside the `authors` list
+    authors = []
+    for a in (data.get("authors") or []):
+        # sometimes it's { "author": { "key": ... } }
+        name = a.get("name") or a.get("author", {}).get("name")
+        if name:
+            authors.append(name)
+    if not authors:
+        # the subject listing has [{"key": ..., "name": ...}]
+        authors = [a.get("name", "Unknown") if isinstance(a, dict) else a
+                   for a in entry.get("authors", [])] or ["Unknown"]
+
+    return {
+        "title":      entry.get("title", "Untitled"),
+        "authors":    authors,
+        "full_text":  desc,
+        "source":     "OpenLibrary",
+        "openlibrary_key": key,
+    }
+
+def openlibrary_works(niche="productivity", max_results=5):
+    """Subject listing only – the work entries whose details still need fetching.
+
+    SEARCH_OVERFETCH× as many entries are listed and the `max_results`
+    that best fit the niche (title / subject words, edition count) kept.
+    """
     subj = clean_subject(niche)
-    url = f"https://openlibrary.org/subjects/{subj}.json?limit={max_results}"
-    print(f"[INFO] OpenLibrary ⟶ Subject search `{niche}` ({max_results})")
-    books = []
+    limit = max_results * SEARCH_OVERFETCH
+    url = f"{OPENLIBRARY_URL}/subjects/{subj}.json?limit={limit}"
+    print(f"[INFO] OpenLibrary ⟶ Subject search `{niche}` (rank {limit}, keep {max_results})")
 
     try:
-        r = requests.get(url)
+        r = http_get(url)
         r.raise_for_status()
         works = r.json().get("works", [])
     except Exception as e:
         print(f"[ERROR] OL subject fetch failed: {e}")
-        works = []
+        return []
+    score = lambda w: catalog.score_listing(niche, w.get("title", ""), w.get("subject") or [],
+                                            w.get("edition_count", 0))
+    return sorted(works, key=score, reverse=True)[:max_results]
 
-    for entry in works:
-        key = entry.get("key", "")
-        if not key.startswith("/works/"):
-            continue
-        detail_url = f"https://openlibrary.org{key}.json"
-
-        try:
-            dr = requests.get(detail_url)
-            dr.raise_for_status()
-            data = dr.json()
-        except Exception as e:
-            print(f"[WARN] Failed to fetch work details {key}: {e}")
-            continue
-
-        desc = data.get("description", "No full text available.")
-        if isinstance(desc, dict):
-            desc = desc.get("value", desc)
-
-        # authors: look inside the `authors` list
-        authors = []
-        for a in (data.get("authors") or []):
-            # sometimes it's { "author": { "key": ... } }
-            name = a.get("name") or a.get("author", {}).get("name")
-            if name:
-                authors.append(name)
-        if not authors:
-            authors = entry.get("authors", ["Unknown"])
-
-        books.append({
-            "title":      entry.get("title", "Untitled"),
-            "authors":    authors,
-            "full_text":  desc,
-            "source":     "OpenLibrary"
-        })
+def fetch_from_openlibrary(niche="productivity", max_results=5, workers=1):
+    works = openlibrary_works(niche, max_results)
+    books = [b for b in parallel_map(_fetch_ol_work, works, workers) if b]
 
     print(f"[INFO] OpenLibrary → Retrieved {len(books)} books for `{niche}`")
     return books
 
 # ——————————————————————————————————————————————————————————————
-# 2) Gutenberg: free-text search + post-filter on title/subjects
+# 2) Gutenberg: works ranked in the local catalog (plain search as fallback)
 # ——————————————————————————————————————————————————————————————
-def fetch_from_gutenberg(niche="productivity", max_results=5):
+def gutenberg_text_urls(bid):
+    return [(f"{GUTENBERG_URL}/files/{bid}/{name.format(bid=bid)}", encoding)
+            for name, encoding in GUTENBERG_TEXT_PATTERNS]
+
+def _response_encoding(r, default):
+    return r.encoding if "charset" in r.headers.get("Content-Type", "") else default
+
+def stream_text(url, max_chars, default_encoding="utf-8"):
+    """Read just enough of a plain-text URL to get `max_chars` of body text.
+
+    The response is decoded incrementally and the Gutenberg licence header is
+    dropped on the fly; the download stops as soon as the text is complete, and
+    a Range request keeps servers from sending more than could be needed.
+    Returns None when the URL does not answer 200/206.
+    """
+    host = urlparse(url).netloc
+    limit = max_chars * 4 + TEXT_HEADER_BYTES           # UTF-8 worst case + header
+    headers = {"Range": f"bytes=0-{limit - 1}"}
+    with _host_slot(url), metrics.span("http_request", host=host), \
+            get_session().get(url, headers=headers, stream=True, timeout=HTTP_TIMEOUT) as r:
+        if r.status_code not in (200, 206):
+            return None
+        decoder = codecs.getincrementaldecoder(_response_encoding(r, default_encoding))("replace")
+
+        def pieces():
+            read = 0
+            for block in r.iter_content(16 * 1024):
+                metrics.incr("bytes_downloaded", len(block), host=host)
+                read += len(block)
+                yield decoder.decode(block)
+                if read >= limit:
+                    break
+            yield decoder.decode(b"", final=True)
+
+        out, size = [], 0
+        for line in chunker.strip_gutenberg_boilerplate(chunker.iter_lines(pieces())):
+            out.append(line)
+            size += len(line) + 1
+            if size >= max_chars:
+                break
+        return "\n".join(out).lstrip("\n")[:max_chars]
+
+def fetch_gutenberg_text(bid, max_chars=None):
+    """A Gutenberg book's text, trying each mirror file pattern in turn.
+
+    With `max_chars` only the opening of the book is streamed (see
+    stream_text); otherwise the whole file goes through the HTTP cache.
+    """
+    max_chars = TEXT_MAX_CHARS if max_chars is None else max_chars
+    for url, encoding in gutenberg_text_urls(bid):
+        try:
+            if max_chars:
+                text = stream_text(url, max_chars, encoding)
+                if text is not None:
+                    return text
+                continue
+            r = http_get(url)
+            if r.status_code == 200:
+                return r.text
+        except Exception as e:
+            print(f"[WARN] Gutenberg text {url} failed: {e}")
+    return None
+
+def _fetch_gutenberg_book(item, max_chars=None):
+    bid = item.get("id")
+    full_text = fetch_gutenberg_text(bid, max_chars) or "No full text available."
+
+    authors = [a.get("name", "Unknown") for a in item.get("authors", [])] or ["Unknown"]
+    return {
+        "title":     item.get("title", ""),
+        "authors":   authors,
+        "full_text": full_text,
+        "source":    "Project Gutenberg",
+        "gutenberg_id": bid,
+    }
+
+def gutendex_search(niche: str, pages: int = 1) -> list:
+    """Gutendex works whose title/author (`search`) or subjects/shelves (`topic`) match."""
+    found = {}
+    for param in ("search", "topic"):
+        url = f"{GUTENDEX_URL}/books/?{param}={quote(niche.strip())}"
+        for _ in range(pages):
+            try:
+                r = http_get(url)
+                r.raise_for_status()
+                data = r.json()
+            except Exception as e:
+                print(f"[ERROR] Gutendex {param} `{niche}` failed: {e}")
+                break
+            for item in data.get("results", []):
+                found.setdefault(item.get("id"), item)
+            url = data.get("next")
+            if not url:
+                break
+    return list(found.values())
+
+def catalog_candidates(niche="productivity", max_results=5):
+    """The `max_results` best-ranked works from the local catalog.
+
+    The catalog is topped up from Gutendex first unless this niche was
+    searched within catalog.CATALOG_TTL.
+    """
+    fresh = catalog.is_fresh(niche)
+    metrics.incr("cache_lookups", cache="catalog", result="hit" if fresh else "miss")
+    note = "from the index"
+    if not fresh:
+        pages = max(catalog.CATALOG_PAGES,
+                    math.ceil(max_results * SEARCH_OVERFETCH / GUTENDEX_PAGE_SIZE))
+        items = gutendex_search(niche, pages)
+        if items:
+            catalog.ingest(items, query=niche)
+        note = f"{len(items)} works listed"
+    ranked = catalog.rank(niche, max_results)
+    print(f"[INFO] Gutenberg ⟶ Ranked `{niche}` ({note}, keep {len(ranked)})")
+    return ranked
+
+def gutenberg_candidates(niche="productivity", max_results=5):
+    """Works that fit the niche, before any full text is downloaded.
+
+    With USE_CATALOG they come ranked from the local catalog; otherwise (or
+    when SQLite fails) from a plain search filtered on title and subjects.
+    """
+    if USE_CATALOG:
+        try:
+            return catalog_candidates(niche, max_results)
+        except sqlite3.Error as e:
+            print(f"[WARN] Catalog unavailable ({e}); using a plain Gutendex search")
     query = niche.strip()
-    url   = f"https://gutendex.com/books/?search={query}&limit={max_results*3}"
+    url   = f"{GUTENDEX_URL}/books/?search={query}&limit={max_results*3}"
     # we fetch 3× as many so we can filter down to max_results
     print(f"[INFO] Gutenberg ⟶ Search `{niche}` (fetch {max_results*3})")
-    books = []
 
     try:
-        r = requests.get(url)
+        r = http_get(url)
         r.raise_for_status()
         results = r.json().get("results", [])
     except Exception as e:
@@ -99,30 +324,20 @@ def fetch_from_gutenberg(niche="productivity", max_results=5):
         results = []
 
     # filter to those that actually mention the niche in title or subjects
-    filtered = []
+    selected = []
     for item in results:
         title   = item.get("title", "")
         subjects = item.get("subjects", [])
         if niche.lower() in title.lower() or any(niche.lower() in s.lower() for s in subjects):
-            # fetch full text
-            bid = item.get("id")
-            txt_url = f"https://www.gutenberg.org/files/{bid}/{bid}-0.txt"
-            try:
-                tr = requests.get(txt_url)
-                full_text = tr.text if tr.status_code == 200 else "No full text available."
-            except:
-                full_text = "No full text available."
-
-            authors = [a.get("name", "Unknown") for a in item.get("authors", [])] or ["Unknown"]
-            filtered.append({
-                "title":     title,
-                "authors":   authors,
-                "full_text": full_text,
-                "source":    "Project Gutenberg"
-            })
-
-        if len(filtered) >= max_results:
+            selected.append(item)
+        if len(selected) >= max_results:
             break
+    return selected
+
+def fetch_from_gutenberg(niche="productivity", max_results=5, workers=1):
+    # download the selected full texts (in parallel when workers > 1)
+    selected = gutenberg_candidates(niche, max_results)
+    filtered = parallel_map(_fetch_gutenberg_book, selected, workers)
 
     print(f"[INFO] Gutenberg → Retrieved {len(filtered)} books for `{niche}`")
     return filtered
@@ -131,26 +346,67 @@ def fetch_from_gutenberg(niche="productivity", max_results=5):
 # 3) Save combined results
 # ——————————————————————————————————————————————————————————————
 def save_books(books):
-    os.makedirs(DATA_DIR, exist_ok=True)
+    """Replace BOOK_PATH with this run's books (written to a temp file first)."""
+    tmp = BOOK_PATH + ".tmp"
     try:
-        with open(BOOK_PATH, "w", encoding="utf-8") as f:
-            json.dump(books, f, indent=2, ensure_ascii=False)
-        print(f"[INFO] Saved {len(books)} books to {BOOK_PATH}")
+        book_store.reset(tmp)
+        count = book_store.append_books(books, tmp)
+        os.replace(tmp, BOOK_PATH)
+        print(f"[INFO] Saved {count} books to {BOOK_PATH}")
     except Exception as e:
         print(f"[ERROR] Saving failed: {e}")
 
 # ——————————————————————————————————————————————————————————————
 # 4) Orchestrator
 # ——————————————————————————————————————————————————————————————
-def fetch_books(niche="productivity", per_source=5):
-    print(f"[INFO] >>> Fetching `{niche}` books ({per_source} each source)")
-    ol_books = fetch_from_openlibrary(niche, per_source)
-    gut_books = fetch_from_gutenberg(niche, per_source)
+def fetch_books(niche="productivity", per_source=5, concurrent=False, workers=None):
+    """Fetch from both sources and save them.
+
+    With ``concurrent=True`` the two sources run side by side and each one
+    downloads its work details / full texts on a pool of ``workers`` threads
+    (default FETCH_WORKERS).
+    """
+    workers = FETCH_WORKERS if workers is None else workers
+    mode = f"concurrent, {workers} workers" if concurrent else "serial"
+    print(f"[INFO] >>> Fetching `{niche}` books ({per_source} each source, {mode})")
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            ol_future  = pool.submit(fetch_from_openlibrary, niche, per_source, workers)
+            gut_future = pool.submit(fetch_from_gutenberg, niche, per_source, workers)
+            ol_books, gut_books = ol_future.result(), gut_future.result()
+    else:
+        ol_books = fetch_from_openlibrary(niche, per_source)
+        gut_books = fetch_from_gutenberg(niche, per_source)
 
     combined = ol_books + gut_books
     save_books(combined)
+    http_cache.flush()
+    http_cache.log_stats()
+    return combined
+
+def iter_fetch_books(niche="productivity", per_source=5, workers=None):
+    """Yield books from both sources as soon as each one is downloaded.
+
+    Used by the streaming pipeline: nothing is saved here and books arrive
+    in completion order rather than source order.
+    """
+    workers = FETCH_WORKERS if workers is None else workers
+    with ThreadPoolExecutor(max_workers=max(2, workers)) as pool:
+        listings = [
+            (pool.submit(openlibrary_works, niche, per_source), _fetch_ol_work),
+            (pool.submit(gutenberg_candidates, niche, per_source), _fetch_gutenberg_book),
+        ]
+        downloads = [pool.submit(fetch_one, item)
+                     for listing, fetch_one in listings
+                     for item in listing.result()]
+        for future in as_completed(downloads):
+            book = future.result()
+            if book:
+                yield book
+    http_cache.flush()
 
 # ——————————————————————————————————————————————————————————————
 if __name__ == "__main__":
     # Change the niche here
-    fetch_books(niche="productivity", per_source=5)
+    with metrics.instrumented("fetch_books"):
+        fetch_books(niche="productivity", per_source=5, concurrent=True)
@@ -3,32 +3,73 @@ from summarize import summarize_books
 from voice_generator import generate_voices
 from video_generator import generate_videos
 import os
+import sys
+import asset_store
+import book_store
+import manifest
+import metrics
+import pipeline
 
 # File Paths
-SUMMARY_FILE = "data/summaries.json"
+SUMMARY_FILE = book_store.SUMMARIES_PATH
+
+def main(niche="productivity", per_source=5, force=False, stream=False, concurrent=True, workers=None):
+    """Run fetch → summarize → voice → video, skipping work that is up to date.
+
+    Every stage records per-book completion in the stage manifest, so a
+    re-run (or a run resumed after a crash) only redoes what changed.
+    Pass `force=True` to ignore the manifest and start from scratch, and
+    `stream=True` to push each book through all stages as soon as it is
+    fetched instead of running the stages one after another.  Books are
+    fetched on `workers` threads (default FETCH_WORKERS) unless
+    `concurrent=False`.
+    """
+    if force:
+        manifest.clear()
+
+    if stream:
+        print("[STEP 1-4] Streaming books through fetch → summarize → voice → video...")
+        pipeline.run_pipeline(niche=niche, per_source=per_source, workers={"fetch": workers})
+        print("[INFO] Process completed successfully!")
+        return
 
-def main():
     print("[STEP 1] Fetching books...")
-    books = fetch_books()
+    fetch_key = manifest.input_hash(niche, per_source)
+    if manifest.run_is_fresh("fetch", fetch_key) and os.path.exists(book_store.BOOKS_PATH):
+        books = sum(1 for _ in book_store.iter_books())
+        print(f"[INFO] Reusing today's fetch ({books} books in {book_store.BOOKS_PATH})")
+    else:
+        with metrics.span("stage", stage="fetch"):
+            books = len(fetch_books(niche=niche, per_source=per_source,
+                                    concurrent=concurrent, workers=workers) or [])
+        if books:
+            manifest.mark_run("fetch", fetch_key, books=books)
 
     if not books:
         print("[ERROR] No books fetched. Exiting process.")
         return
 
     print("[STEP 2] Generating summaries...")
-    summaries = summarize_books()
+    with metrics.span("stage", stage="summarize"):
+        summaries = summarize_books()
 
     if not os.path.exists(SUMMARY_FILE) or not summaries:
         print("[ERROR] No summaries found. Skipping voice and video generation.")
         return
 
     print("[STEP 3] Generating voice files...")
-    generate_voices(SUMMARY_FILE)
+    with metrics.span("stage", stage="voice"):
+        generate_voices(SUMMARY_FILE)
 
     print("[STEP 4] Generating videos...")
-    generate_videos(SUMMARY_FILE)
+    with metrics.span("stage", stage="video"):
+        generate_videos(SUMMARY_FILE)
 
+    # evict voices / videos unused for ASSET_MAX_AGE (this run's books are kept)
+    asset_store.gc(asset_store.live_book_ids(SUMMARY_FILE))
     print("[INFO] Process completed successfully!")
 
 if __name__ == "__main__":
-    main()
+    # --metrics PATH (.jsonl / .prom), --profile and --tracemalloc are handled by metrics
+    with metrics.instrumented("generate_all"):
+        main(force="--force" in sys.argv, stream="--stream" in sys.argv)
@@ -0,0 +1,213 @@
+"""
+Persistent on-disk HTTP cache for the book fetchers.
+
+Response bodies are stored content-addressed (``objects/<sha256>``) so the
+same payload reached through different URLs is only kept once.  A small JSON
+index maps each URL to its blob plus the validators (ETag / Last-Modified)
+needed to revalidate it once its TTL expires.  The cache is bounded by
+``MAX_CACHE_BYTES`` and evicts the least recently used URLs first.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import metrics
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+CACHE_DIR       = os.path.join("data", "http_cache")
+MAX_CACHE_BYTES = 512 * 1024 * 1024        # 512 MB of bodies on disk
+
+DAY = 24 * 60 * 60
+# (endpoint type, URL fragment, TTL) – first match wins
+ENDPOINT_TTLS = [
+    ("openlibrary_subject", "openlibrary.org/subjects/", 1 * DAY),
+    ("openlibrary_work",    "openlibrary.org/works/",    7 * DAY),
+    ("gutendex_search",     "gutendex.com/books",        1 * DAY),
+    ("gutenberg_text",      "gutenberg.org/",            30 * DAY),
+]
+DEFAULT_TTL = 1 * DAY
+
+_lock  = threading.RLock()
+_index = None
+_stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+# ——————————————————————————————————————————————————————————————
+# Cached response (mirrors the bits of requests.Response we use)
+# ——————————————————————————————————————————————————————————————
+class CachedResponse:
+    def __init__(self, url, content, encoding="utf-8", headers=None, from_cache=True):
+        self.url         = url
+        self.status_code = 200
+        self.content     = content
+        self.encoding    = encoding or "utf-8"
+        self.headers     = headers or {}
+        self.from_cache  = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        return None
+
+# ——————————————————————————————————————————————————————————————
+# Index & blob helpers
+# ——————————————————————————————————————————————————————————————
+def _index_path() -> str:
+    return os.path.join(CACHE_DIR, "index.json")
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, "objects", digest[:2], digest)
+
+def _load_index() -> dict:
+    global _index
+    if _index is None:
+        try:
+            with open(_index_path(), encoding="utf-8") as f:
+                _index = json.load(f)
+        except (OSError, ValueError):
+            _index = {}
+    return _index
+
+def endpoint_ttl(url: str) -> tuple[str, int]:
+    for kind, fragment, ttl in ENDPOINT_TTLS:
+        if fragment in url:
+            return kind, ttl
+    return "other", DEFAULT_TTL
+
+def _read_blob(digest: str):
+    try:
+        with open(_blob_path(digest), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write_blob(content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    return digest
+
+def _evict(index: dict):
+    """Drop least-recently-used URLs until unique blob bytes fit the budget."""
+    sizes = {e["blob"]: e["size"] for e in index.values()}
+    total = sum(sizes.values())
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url in sorted(index, key=lambda u: index[u]["last_used"]):
+        if total <= MAX_CACHE_BYTES:
+            break
+        digest = index.pop(url)["blob"]
+        _stats["evicted"] += 1
+        if not any(e["blob"] == digest for e in index.values()):
+            total -= sizes[digest]
+            try:
+                os.remove(_blob_path(digest))
+            except OSError:
+                pass
+
+# ——————————————————————————————————————————————————————————————
+# Public API
+# ——————————————————————————————————————————————————————————————
+def cached_get(url: str, fetch, **kwargs):
+    """GET ``url`` via ``fetch(url, **kwargs)``, serving fresh hits from disk.
+
+    Stale entries are revalidated with If-None-Match / If-Modified-Since; a
+    304 refreshes the TTL without re-downloading the body.  Non-200 answers
+    are returned as-is and never cached.
+    """
+    kind, ttl = endpoint_ttl(url)
+    now = time.time()
+    with _lock:
+        entry = dict(_load_index().get(url) or {})
+    body = _read_blob(entry["blob"]) if entry else None
+
+    if body is not None and now - entry["fetched_at"] < ttl:
+        with _lock:
+            if url in _index:
+                _index[url]["last_used"] = now
+            _stats["hits"] += 1
+        metrics.incr("cache_lookups", cache="http", endpoint=kind, result="hit")
+        return CachedResponse(url, body, entry.get("encoding"))
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if body is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    r = fetch(url, headers=headers, **kwargs)
+
+    if r.status_code == 304 and body is not None:
+        with _lock:
+            if url in _index:
+                _index[url].update(fetched_at=now, last_used=now)
+            _stats["revalidated"] += 1
+        metrics.incr("cache_lookups", cache="http", endpoint=kind, result="revalidated")
+        return CachedResponse(url, body, entry.get("encoding"))
+
+    with _lock:
+        _stats["misses"] += 1
+    metrics.incr("cache_lookups", cache="http", endpoint=kind, result="miss")
+    if r.status_code != 200:
+        return r
+
+    content  = r.content
+    encoding = r.encoding or r.apparent_encoding or "utf-8"
+    digest   = _write_blob(content)
+    with _lock:
+        index = _load_index()
+        index[url] = {
+            "blob":          digest,
+            "size":          len(content),
+            "type":          kind,
+            "etag":          r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "encoding":      encoding,
+            "fetched_at":    now,
+            "last_used":     now,
+        }
+        _stats["stored"] += 1
+        _evict(index)
+    return CachedResponse(url, content, encoding, from_cache=False)
+
+def flush():
+    """Persist the index atomically."""
+    with _lock:
+        if _index is None:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = _index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_index, f)
+        os.replace(tmp, _index_path())
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+def reset_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+
+def log_stats(label="HTTP cache"):
+    s = stats()
+    lookups = s["hits"] + s["revalidated"] + s["misses"]
+    rate = (s["hits"] + s["revalidated"]) / lookups * 100 if lookups else 0.0
+    print(f"[INFO] {label} → hits={s['hits']} revalidated={s['revalidated']} "
+          f"misses={s['misses']} evicted={s['evicted']} ({rate:.0f}% served locally)")
@@ -0,0 +1,158 @@
+"""
+Offline Reel compositor – a local alternative to the Creatomate render API.
+
+Each book becomes a vertical video: a title card followed by one card per
+summary bullet, drawn with Pillow over a background frame, timed to the
+book's ``voices/*.mp3`` narration (capped at the Reel length) and encoded
+with moviepy.  Several books are rendered in parallel on a process pool.
+
+The "draft" preset renders at quarter resolution and a few frames per
+second for quick previews; "final" is full size at 30 fps.
+"""
+
+import os
+import glob
+import hashlib
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+
+# ────────────────────────────────────────────────────────────────
+# Config & constants
+# ────────────────────────────────────────────────────────────────
+BACKGROUND_DIR = os.path.join("assets", "backgrounds")   # optional *.jpg / *.png
+PRESETS = {
+    #         scale of WIDTH×HEIGHT, fps,  x264 preset
+    "final": {"scale": 1.0,  "fps": 30, "codec_preset": "medium"},
+    "draft": {"scale": 0.25, "fps": 4,  "codec_preset": "ultrafast"},
+}
+SILENT_SECONDS_PER_CARD = 4      # card length when a book has no narration
+RENDER_PROCESSES = os.cpu_count() or 2
+
+# ────────────────────────────────────────────────────────────────
+# moviepy 1.x / 2.x compatibility
+# ────────────────────────────────────────────────────────────────
+def _moviepy():
+    try:
+        import moviepy as mp
+        mp.ImageClip                      # 2.x exports clips at top level
+    except (ImportError, AttributeError):
+        import moviepy.editor as mp       # 1.x
+    return mp
+
+def _call(clip, new, old, *args):
+    return getattr(clip, new)(*args) if hasattr(clip, new) else getattr(clip, old)(*args)
+
+# ────────────────────────────────────────────────────────────────
+# Frames
+# ────────────────────────────────────────────────────────────────
+def _font(size):
+    from PIL import ImageFont
+    for name in ("DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:                     # Pillow < 10.1
+        return ImageFont.load_default()
+
+def _background(seed: str, width: int, height: int):
+    """A background image from BACKGROUND_DIR, or a gradient coloured by `seed`."""
+    from PIL import Image
+    files = sorted(glob.glob(os.path.join(BACKGROUND_DIR, "*.[jp][pn]g")))
+    digest = hashlib.sha1(seed.encode("utf-8")).digest()
+    if files:
+        img = Image.open(files[digest[0] % len(files)]).convert("RGB")
+        return img.resize((width, height))
+    top = tuple(40 + b % 80 for b in digest[:3])
+    bottom = tuple(c // 4 for c in top)
+    img = Image.new("RGB", (1, height))
+    for y in range(height):
+        t = y / max(1, height - 1)
+        img.putpixel((0, y), tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+    return img.resize((width, height))
+
+def draw_card(background, text: str, title: bool = False):
+    """Return an RGB numpy frame with `text` wrapped and centred on `background`."""
+    import numpy as np
+    from PIL import ImageDraw
+    img = background.copy()
+    width, height = img.size
+    size = max(10, width // (12 if title else 20))
+    font = _font(size)
+    chars = max(8, int(width * 0.85 / (size * 0.55)))
+    lines = []
+    for para in text.strip().splitlines() or [""]:
+        lines.extend(textwrap.wrap(para.strip(), chars) or [""])
+    max_lines = max(1, int(height * 0.8 / (size * 1.3)))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines - 1] + [lines[max_lines - 1].rstrip() + " …"]
+    draw = ImageDraw.Draw(img)
+    y = (height - len(lines) * size * 1.3) / 2
+    for line in lines:
+        w = draw.textlength(line, font=font)
+        draw.text(((width - w) / 2, y), line, font=font, fill=(255, 255, 255),
+                  stroke_width=max(1, size // 15), stroke_fill=(0, 0, 0))
+        y += size * 1.3
+    return np.asarray(img)
+
+# ────────────────────────────────────────────────────────────────
+# Rendering
+# ────────────────────────────────────────────────────────────────
+def render_local(book: dict, out_path: str, audio_paths: list, width: int, height: int,
+                 max_duration: float, preset: str = "final") -> str:
+    """Composite one book's Reel to `out_path` (runs inside a worker process)."""
+    mp = _moviepy()
+    opts = PRESETS[preset]
+    w = int(width * opts["scale"]) // 2 * 2           # x264 needs even sizes
+    h = int(height * opts["scale"]) // 2 * 2
+
+    bullets = [s for s in book.get("summaries", []) if s.strip()] or ["No summary."]
+    cards = [(book.get("title", "Untitled"), True)] + [(b, False) for b in bullets]
+
+    audio = None
+    tracks = [mp.AudioFileClip(p) for p in audio_paths if os.path.exists(p)]
+    if tracks:
+        audio = mp.concatenate_audioclips(tracks)
+        duration = min(audio.duration, max_duration)
+        audio = _call(audio, "subclipped", "subclip", 0, duration)
+    else:
+        duration = min(len(cards) * SILENT_SECONDS_PER_CARD, max_duration)
+
+    background = _background(book.get("title", ""), w, h)
+    per_card = duration / len(cards)
+    clips = [_call(mp.ImageClip(draw_card(background, text, is_title)),
+                   "with_duration", "set_duration", per_card)
+             for text, is_title in cards]
+    video = mp.concatenate_videoclips(clips)
+    if audio is not None:
+        video = _call(video, "with_audio", "set_audio", audio)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp = out_path + ".tmp.mp4"
+    video.write_videofile(tmp, fps=opts["fps"], codec="libx264", audio_codec="aac",
+                          preset=opts["codec_preset"], logger=None)
+    os.replace(tmp, out_path)
+    for clip in tracks:
+        clip.close()
+    return out_path
+
+def render_many(jobs: list, processes: int = None) -> dict:
+    """Render `jobs` ({key, kwargs for render_local}) across CPU cores.
+
+    Returns {key: mp4 path} for the renders that succeeded.
+    """
+    processes = RENDER_PROCESSES if processes is None else processes
+    results = {}
+    if not jobs:
+        return results
+    with ProcessPoolExecutor(max_workers=max(1, min(processes, len(jobs)))) as pool:
+        futures = {job["key"]: pool.submit(render_local, **job["kwargs"]) for job in jobs}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+                print(f"[INFO] Rendered locally: {results[key]}")
+            except Exception as e:
+                print(f"[WARN] Local render failed for {key}: {e}")
+    return results
@@ -0,0 +1,143 @@
+"""
+Stage manifest for resumable pipeline runs.
+
+``data/manifest.json`` records, for every book and every stage, the hash of
+the inputs the stage last completed with and whatever it produced.  A stage
+skips a book whose recorded hash still matches.  Every completed book is
+appended to a journal (``manifest.json.journal``) as one JSON line, so an
+interrupted run resumes where it stopped without the whole manifest being
+rewritten per book; the journal is folded into the manifest every
+COMPACT_EVERY entries and at exit.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+MANIFEST_PATH  = os.path.join("data", "manifest.json")
+FETCH_MAX_AGE  = 24 * 60 * 60      # a fetch is reused for one day
+COMPACT_EVERY  = 500               # journal entries before the manifest is rewritten
+
+_lock    = threading.RLock()
+_data    = None
+_journal = 0                       # entries appended since the last rewrite
+
+def _journal_path() -> str:
+    return MANIFEST_PATH + ".journal"
+
+def _apply(data: dict, line: dict):
+    if "run" in line:
+        data["runs"][line["run"]] = line["entry"]
+    else:
+        data["books"].setdefault(line["book"], {})[line["stage"]] = line["entry"]
+
+def _load() -> dict:
+    global _data, _journal
+    if _data is None:
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                _data = json.load(f)
+        except (OSError, ValueError):
+            _data = {}
+        _data.setdefault("runs", {})
+        _data.setdefault("books", {})
+        torn = False
+        try:
+            with open(_journal_path(), encoding="utf-8") as f:
+                for raw in f:
+                    try:
+                        _apply(_data, json.loads(raw))
+                        _journal += 1
+                    except (ValueError, KeyError):
+                        torn = True                # last line of a crashed run
+        except OSError:
+            pass
+        if torn:
+            _save()                                # don't append after a partial line
+    return _data
+
+def _save():
+    """Rewrite the manifest with everything recorded and drop the journal."""
+    global _journal
+    os.makedirs(os.path.dirname(MANIFEST_PATH) or ".", exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+    if os.path.exists(_journal_path()):
+        os.remove(_journal_path())
+    _journal = 0
+
+def _record(line: dict):
+    """Apply one entry and append it to the journal (compacting now and then)."""
+    global _journal
+    _apply(_load(), line)
+    os.makedirs(os.path.dirname(MANIFEST_PATH) or ".", exist_ok=True)
+    with open(_journal_path(), "a", encoding="utf-8") as f:
+        f.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+    _journal += 1
+    if _journal >= COMPACT_EVERY:
+        _save()
+
+def flush():
+    """Fold the journal into the manifest."""
+    with _lock:
+        if _data is not None and _journal:
+            _save()
+
+atexit.register(flush)
+
+def input_hash(*parts) -> str:
+    """Hash of JSON-serialisable stage inputs."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:20]
+
+def text_hash(pieces) -> str:
+    """Hash a streamed text without joining it."""
+    h = hashlib.sha256()
+    for piece in pieces:
+        h.update(piece.encode("utf-8"))
+    return h.hexdigest()[:20]
+
+# ——————————————————————————————————————————————————————————————
+# Per-book stages
+# ——————————————————————————————————————————————————————————————
+def get(book_id: str, stage: str) -> dict | None:
+    with _lock:
+        entry = _load()["books"].get(book_id, {}).get(stage)
+        return dict(entry) if entry else None
+
+def is_done(book_id: str, stage: str, digest: str) -> bool:
+    entry = get(book_id, stage)
+    return bool(entry) and entry.get("input") == digest
+
+def mark_done(book_id: str, stage: str, digest: str, **output):
+    """Record a finished stage for one book (journaled, so it survives a crash)."""
+    with _lock:
+        _record({"book": book_id, "stage": stage,
+                 "entry": {"input": digest, "done_at": time.time(), **output}})
+
+# ——————————————————————————————————————————————————————————————
+# Whole-run stages (fetch)
+# ——————————————————————————————————————————————————————————————
+def run_is_fresh(stage: str, digest: str, max_age: float = FETCH_MAX_AGE) -> bool:
+    with _lock:
+        entry = _load()["runs"].get(stage)
+    return bool(entry) and entry.get("input") == digest and time.time() - entry["done_at"] < max_age
+
+def mark_run(stage: str, digest: str, **output):
+    with _lock:
+        _record({"run": stage, "entry": {"input": digest, "done_at": time.time(), **output}})
+
+def clear():
+    """Forget every recorded stage (forces a full re-run)."""
+    global _data
+    with _lock:
+        _data = {"runs": {}, "books": {}}
+        _save()
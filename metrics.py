@@ -0,0 +1,220 @@
+"""
+Shared timing / counter instrumentation for every pipeline module.
+
+    with metrics.span("http_request", host="gutendex.com"):
+        ...
+    metrics.incr("bytes_downloaded", len(body))
+
+Spans aggregate into per-(name, labels) summaries (count, sum, min, max and a
+bounded sample for quantiles); counters are plain sums.  Nothing is written
+unless an export is requested – either a JSON-lines file or a Prometheus
+textfile (chosen by extension, ``.prom``).
+
+Scripts wrap their ``__main__`` in ``metrics.instrumented(...)``, which
+understands ``--metrics PATH``, ``--profile`` (cProfile) and
+``--tracemalloc`` on the command line (or METRICS_PATH in the environment).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+# ——————————————————————————————————————————————————————————————
+# Configuration
+# ——————————————————————————————————————————————————————————————
+PREFIX         = "book_pipeline"
+SAMPLE_SIZE    = 1024                       # reservoir per span series
+PROFILE_DIR    = os.path.join("data", "profiles")
+QUANTILES      = (0.5, 0.9, 0.95, 0.99)
+
+_lock     = threading.Lock()
+_spans    = {}          # (name, labels) → {"count", "sum", "min", "max", "samples"}
+_counters = {}          # (name, labels) → value
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+# ——————————————————————————————————————————————————————————————
+# Recording
+# ——————————————————————————————————————————————————————————————
+def observe(name: str, seconds: float, **labels):
+    with _lock:
+        s = _spans.get(_key(name, labels))
+        if s is None:
+            s = _spans[_key(name, labels)] = {"count": 0, "sum": 0.0, "min": seconds,
+                                              "max": seconds, "samples": []}
+        s["count"] += 1
+        s["sum"]   += seconds
+        s["min"]    = min(s["min"], seconds)
+        s["max"]    = max(s["max"], seconds)
+        if len(s["samples"]) < SAMPLE_SIZE:
+            s["samples"].append(seconds)
+        else:                                   # reservoir sampling
+            j = random.randrange(s["count"])
+            if j < SAMPLE_SIZE:
+                s["samples"][j] = seconds
+
+@contextmanager
+def span(name: str, **labels):
+    """Time the block; failures are recorded with error="1"."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe(name, time.perf_counter() - t0, **labels, error="1")
+        raise
+    observe(name, time.perf_counter() - t0, **labels)
+
+def incr(name: str, value: float = 1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+# ——————————————————————————————————————————————————————————————
+# Export
+# ——————————————————————————————————————————————————————————————
+def _quantile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+def snapshot() -> list[dict]:
+    """One dict per span series / counter, ready to be serialised."""
+    now = time.time()
+    rows = []
+    with _lock:
+        for (name, labels), s in sorted(_spans.items()):
+            rows.append({
+                "ts": now, "type": "span", "name": name, "labels": dict(labels),
+                "count": s["count"], "sum": round(s["sum"], 6),
+                "min": round(s["min"], 6), "max": round(s["max"], 6),
+                **{f"p{int(q * 100)}": round(_quantile(s["samples"], q), 6) for q in QUANTILES},
+            })
+        for (name, labels), value in sorted(_counters.items()):
+            rows.append({"ts": now, "type": "counter", "name": name,
+                         "labels": dict(labels), "value": value})
+    return rows
+
+def _prom_labels(labels: dict, **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for k, v in items.items())
+    return "{" + body + "}"
+
+def to_prometheus(rows) -> str:
+    lines, typed = [], set()
+    for row in rows:
+        if row["type"] == "span":
+            metric = f"{PREFIX}_{row['name']}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} summary")
+                typed.add(metric)
+            for q in QUANTILES:
+                lines.append(f"{metric}{_prom_labels(row['labels'], quantile=q)} "
+                             f"{row[f'p{int(q * 100)}']}")
+            lines.append(f"{metric}_sum{_prom_labels(row['labels'])} {row['sum']}")
+            lines.append(f"{metric}_count{_prom_labels(row['labels'])} {row['count']}")
+        else:
+            metric = f"{PREFIX}_{row['name']}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_prom_labels(row['labels'])} {row['value']}")
+    return "\n".join(lines) + "\n"
+
+def export(path: str):
+    """Append a JSON-lines snapshot, or (for *.prom) rewrite a Prometheus textfile."""
+    rows = snapshot()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".prom"):
+        tmp = path + ".tmp"                     # node_exporter reads the file atomically
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(to_prometheus(rows))
+        os.replace(tmp, path)
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+    print(f"[INFO] Metrics → {len(rows)} series written to {path}")
+
+def log_summary(top: int = 12):
+    """Print where the time went: span series ordered by total seconds."""
+    rows = [r for r in snapshot() if r["type"] == "span"]
+    for r in sorted(rows, key=lambda r: r["sum"], reverse=True)[:top]:
+        labels = ",".join(f"{k}={v}" for k, v in r["labels"].items())
+        print(f"[INFO] span {r['name']:<18} {labels:<32} n={r['count']:<6} "
+              f"total={r['sum']:.2f}s p50={r['p50'] * 1000:.0f}ms p95={r['p95'] * 1000:.0f}ms")
+
+# ——————————————————————————————————————————————————————————————
+# Profiling hooks & script entry points
+# ——————————————————————————————————————————————————————————————
+@contextmanager
+def profiled(name: str, cprofile: bool = False, trace_memory: bool = False, out_dir: str = PROFILE_DIR):
+    """Optionally run the block under cProfile and/or tracemalloc."""
+    profiler = None
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start(25)
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            import pstats
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            print(f"[INFO] cProfile → {path} (top functions by cumulative time)")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        if trace_memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            tracemalloc.stop()
+            print(f"[INFO] tracemalloc → current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB")
+            for stat in top:
+                print(f"[INFO]   {stat}")
+
+def flags(argv=None) -> dict:
+    """Pick the instrumentation flags out of argv (other arguments are ignored)."""
+    argv = sys.argv[1:] if argv is None else argv
+    path = os.getenv("METRICS_PATH")
+    for i, arg in enumerate(argv):
+        if arg == "--metrics" and i + 1 < len(argv):
+            path = argv[i + 1]
+        elif arg.startswith("--metrics="):
+            path = arg.split("=", 1)[1]
+    return {"metrics": path, "profile": "--profile" in argv, "tracemalloc": "--tracemalloc" in argv}
+
+def positional(argv=None) -> list:
+    """argv without flags and without the value that follows ``--metrics``."""
+    argv = sys.argv[1:] if argv is None else argv
+    return [a for i, a in enumerate(argv)
+            if not a.startswith("--") and (i == 0 or argv[i - 1] != "--metrics")]
+
+@contextmanager
+def instrumented(name: str, argv=None):
+    """Wrap a script's main(): profiling per flags, metrics summary + export at the end."""
+    opts = flags(argv)
+    try:
+        with profiled(name, opts["profile"], opts["tracemalloc"]):
+            yield
+    finally:
+        log_summary()
+        if opts["metrics"]:
+            export(opts["metrics"])
@@ -0,0 +1,190 @@
+"""
+Streaming pipeline: every book flows fetch → summarize → voice → video on
+its own, instead of each stage waiting for the whole corpus.
+
+Stages are connected by bounded queues, so a slow stage applies
+backpressure to the ones before it, and each stage runs its own pool of
+worker threads.  Outputs are still appended to ``books.jsonl`` /
+``summaries.jsonl`` and recorded in the stage manifest, so a streamed run
+and a batch run leave the same state behind (records land in completion
+order rather than fetch order).
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import asset_store
+import book_store
+import fetch_books
+import metrics
+import rate_limit
+import summarize
+
+# ——————————————————————————————————————————————————————————————
+# Configuration
+# ——————————————————————————————————————————————————————————————
+QUEUE_SIZE = 4                 # books buffered between two stages
+STAGE_WORKERS = {
+    "fetch":     None,         # None → fetch_books.FETCH_WORKERS
+    "summarize": 2,            # books in flight; their chunks share one pool
+    "voice":     2,
+    "video":     2,
+}
+
+_DONE = object()               # end-of-stream marker
+
+# ——————————————————————————————————————————————————————————————
+# Stage runner
+# ——————————————————————————————————————————————————————————————
+class StageStats:
+    def __init__(self, name):
+        self.name   = name
+        self.lock   = threading.Lock()
+        self.done   = 0
+        self.failed = 0
+        self.busy   = 0.0
+        self.first  = None
+
+    def record(self, seconds, ok, started_at):
+        metrics.observe("stage_item", seconds, stage=self.name, ok=int(ok))
+        with self.lock:
+            self.busy += seconds
+            if ok:
+                self.done += 1
+                if self.first is None:
+                    self.first = time.perf_counter() - started_at
+            else:
+                self.failed += 1
+
+def _start_stage(name, fn, inbox, outbox, workers, stats, started_at):
+    """Run `fn` on `workers` threads; returns the thread that closes `outbox`."""
+    def work():
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                inbox.put(_DONE)           # let sibling workers see it too
+                return
+            t0 = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                print(f"[WARN] {name}: '{item.get('title', 'Untitled')}' failed: {e}")
+                result = None
+            stats.record(time.perf_counter() - t0, result is not None, started_at)
+            if result is not None and outbox is not None:
+                outbox.put(result)         # blocks while the next stage is full
+
+    threads = [threading.Thread(target=work, name=f"{name}-{i}", daemon=True)
+               for i in range(max(1, workers))]
+    for t in threads:
+        t.start()
+
+    def close():
+        for t in threads:
+            t.join()
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    closer = threading.Thread(target=close, name=f"{name}-close", daemon=True)
+    closer.start()
+    return closer
+
+# ——————————————————————————————————————————————————————————————
+# Entry point
+# ——————————————————————————————————————————————————————————————
+def run_pipeline(niche="productivity", per_source=5, workers=None, queue_size=None,
+                 with_voice=True, with_video=True):
+    """Stream books through every stage; returns the list of finished videos."""
+    if with_voice:
+        import voice_generator
+    if with_video:
+        import video_generator
+
+    workers = {**STAGE_WORKERS, **(workers or {})}
+    workers["fetch"] = workers["fetch"] or fetch_books.FETCH_WORKERS
+    queue_size = QUEUE_SIZE if queue_size is None else queue_size
+    started_at = time.perf_counter()
+    stats = {name: StageStats(name) for name in ("fetch", "summarize", "voice", "video")}
+
+    books_tmp = fetch_books.BOOK_PATH + ".tmp"
+    summaries_tmp = summarize.SUMMARY_PATH + ".stream"
+    previous = summarize._previous_summaries()
+    book_store.reset(books_tmp)
+    book_store.reset(summaries_tmp)
+    write_lock = threading.Lock()
+
+    limiter = rate_limit.TokenBucket(summarize.API_RATE)
+    chunk_pool = ThreadPoolExecutor(max_workers=max(summarize.SUMMARY_WORKERS,
+                                                    summarize.get_summarizer().concurrency))
+    videos = []
+
+    def store(book):
+        record = book_store.to_record(book)
+        book_store.append_records(books_tmp, [record])
+        return record
+
+    def summarize_stage(record):
+        summary, _ = summarize.summarize_book(record, chunk_pool, limiter, previous=previous)
+        if summary:
+            with write_lock:
+                book_store.append_records(summaries_tmp, [summary])
+        return summary
+
+    def voice_stage(summary):
+        paths, _ = voice_generator.ensure_voices(summary)
+        return summary if paths else None
+
+    def video_stage(summary):
+        path, _ = video_generator.ensure_video(summary)
+        with write_lock:
+            videos.append(path)
+        print(f"[INFO] Pipeline → video ready after {time.perf_counter() - started_at:.1f}s: {path}")
+        return path
+
+    stages = [("summarize", summarize_stage)]
+    if with_voice:
+        stages.append(("voice", voice_stage))
+    if with_video:
+        stages.append(("video", video_stage))
+
+    # fetch → q0 → summarize → q1 → voice → q2 → video
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    closers = []
+    for i, (name, fn) in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(queues) else None
+        closers.append(_start_stage(name, fn, queues[i], outbox, workers[name],
+                                    stats[name], started_at))
+
+    try:
+        for book in fetch_books.iter_fetch_books(niche, per_source, workers["fetch"]):
+            t0 = time.perf_counter()
+            queues[0].put(store(book))
+            stats["fetch"].record(time.perf_counter() - t0, True, started_at)
+    finally:
+        queues[0].put(_DONE)
+        for closer in closers:
+            closer.join()
+        chunk_pool.shutdown()
+
+    # an empty run must not wipe out the previous books / summaries
+    for tmp, final, stage in ((books_tmp, fetch_books.BOOK_PATH, "fetch"),
+                              (summaries_tmp, summarize.SUMMARY_PATH, "summarize")):
+        if stats[stage].done:
+            os.replace(tmp, final)
+        else:
+            os.remove(tmp)
+            print(f"[WARN] Pipeline {stage} produced nothing; keeping {final}")
+    if with_video and stats["video"].done:
+        asset_store.gc(asset_store.live_book_ids(summarize.SUMMARY_PATH))
+
+    elapsed = time.perf_counter() - started_at
+    for s in stats.values():
+        if s.done or s.failed:
+            first = f", first after {s.first:.1f}s" if s.first is not None else ""
+            print(f"[INFO] Pipeline {s.name:<9} → {s.done} ok, {s.failed} failed, "
+                  f"{s.busy:.1f}s busy{first}")
+    print(f"[INFO] Pipeline finished in {elapsed:.1f}s ({len(videos)} videos)")
+    return videos
@@ -0,0 +1,79 @@
+"""
+Thread-safe token bucket shared by the API workers.
+
+``acquire()`` blocks until a token is available.  When the API answers 429
+the bucket is paused for the back-off delay and its rate is halved, then
+recovers additively on every success (AIMD), so all workers slow down
+together instead of each one hammering the API on its own schedule.
+"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+BACKOFF_BASE = 2.0      # seconds, first retry window
+BACKOFF_CAP  = 60.0     # seconds, longest single wait
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = None):
+        self.max_rate = float(rate)
+        self.rate     = float(rate)
+        self.min_rate = min_rate if min_rate is not None else max(self.max_rate / 16, 0.05)
+        self.capacity = capacity if capacity is not None else max(1.0, self.max_rate)
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self.paused_until = 0.0
+        self.lock     = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttle(self, delay: float):
+        """Pause every caller for `delay` seconds and halve the rate."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.rate   = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+
+    def success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+def retry_after(exc) -> float | None:
+    """Seconds from a Retry-After header on the exception (or its response)."""
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, exc=None) -> float:
+    """Retry-After when the server sent one, otherwise full-jitter exponential."""
+    hinted = retry_after(exc) if exc is not None else None
+    if hinted is not None:
+        return min(hinted, BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
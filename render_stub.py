@@ -0,0 +1,113 @@
+"""
+Local stand-in for the Creatomate render API, for offline runs and tests.
+
+    python render_stub.py            # serves on 127.0.0.1:8765
+    export CREATOMATE_API_URL=http://127.0.0.1:8765/v1/renders
+    export CREATOMATE_API_KEY=stub
+    python video_generator.py --batch
+
+POST /v1/renders queues a render that moves planned → rendering → finished
+after RENDER_SECONDS; GET /v1/renders/<id> reports its status and
+/files/<id>.mp4 serves a dummy MP4 with HTTP Range support.
+"""
+
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST, PORT     = "127.0.0.1", 8765
+RENDER_SECONDS = 3.0                 # time until a render reports "finished"
+FILE_BYTES     = 256 * 1024          # size of the dummy MP4
+
+def _fake_mp4(render_id: str, size: int) -> bytes:
+    head = b"\x00\x00\x00\x18ftypmp42" + render_id.encode()
+    return (head * (size // len(head) + 1))[:size]
+
+class RenderStubHandler(BaseHTTPRequestHandler):
+    renders = {}                     # render_id → created (monotonic)
+    lock = threading.Lock()
+    render_seconds = RENDER_SECONDS
+    file_bytes = FILE_BYTES
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _status(self, render_id):
+        age = time.monotonic() - self.renders[render_id]
+        if age >= self.render_seconds:
+            return "finished"
+        return "rendering" if age >= self.render_seconds / 3 else "planned"
+
+    def _render(self, render_id):
+        host = self.headers.get("Host", f"{HOST}:{PORT}")
+        body = {"id": render_id, "status": self._status(render_id)}
+        if body["status"] == "finished":
+            body["url"] = f"http://{host}/files/{render_id}.mp4"
+        return body
+
+    def do_POST(self):
+        if self.path.split("?")[0].rstrip("/") != "/v1/renders":
+            return self._json(404, {"error": "not found"})
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        render_id = str(uuid.uuid4())
+        with self.lock:
+            self.renders[render_id] = time.monotonic()
+        self._json(202, [self._render(render_id)])
+
+    def do_GET(self):
+        m = re.match(r"^/v1/renders/([0-9a-fA-F-]+)$", self.path)
+        if m:
+            if m.group(1) not in self.renders:
+                return self._json(404, {"error": "unknown render"})
+            return self._json(200, self._render(m.group(1)))
+
+        m = re.match(r"^/files/([0-9a-fA-F-]+)\.mp4$", self.path)
+        if not m or m.group(1) not in self.renders:
+            return self._json(404, {"error": "not found"})
+        data = _fake_mp4(m.group(1), self.file_bytes)
+        start = 0
+        rng = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if rng:
+            start = int(rng.group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+def start_stub(host=HOST, port=0, render_seconds=RENDER_SECONDS, file_bytes=FILE_BYTES):
+    """Start the stub on a background thread; returns (server, renders API URL)."""
+    handler = type("Handler", (RenderStubHandler,), {
+        "renders": {}, "render_seconds": render_seconds, "file_bytes": file_bytes,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1/renders"
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    handler = type("Handler", (RenderStubHandler,), {"renders": {}})
+    server = ThreadingHTTPServer((HOST, port), handler)
+    print(f"[INFO] Render stub on http://{HOST}:{port}/v1/renders")
+    server.serve_forever()
@@ -1,104 +1,371 @@
 import os
 import json
 import time
-import cohere
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import book_store
+import chunker
+import manifest
+import metrics
+import rate_limit
+import summarizers
+import summary_cache
 
 # ————————————————
 # Configuration
 # ————————————————
-COHERE_API_KEY = os.getenv("COHERE_API_KEY")
-if not COHERE_API_KEY:
-    raise RuntimeError("[ERROR] Missing COHERE_API_KEY environment variable!")
-co = cohere.Client(COHERE_API_KEY)
+SUMMARY_BACKEND = os.getenv("SUMMARY_BACKEND", "cohere")   # or "transformers" / "extractive"
+LOCAL_THREADS   = None    # torch threads for the transformers backend (None = torch default)
+
+co = None                 # cohere.Client, created on first use (see get_cohere)
+
+DATA_DIR     = book_store.DATA_DIR
+BOOK_PATH    = book_store.BOOKS_PATH
+SUMMARY_PATH = book_store.SUMMARIES_PATH
+STATS_PATH   = os.path.join(DATA_DIR, "summaries_stats.json")
 
-DATA_DIR     = "data"
-BOOK_PATH    = os.path.join(DATA_DIR, "books.json")
-SUMMARY_PATH = os.path.join(DATA_DIR, "summaries.json")
+# Cohere parameters – part of the summary cache key
+SUMMARY_PARAMS = {
+    "model":          "summarize-xlarge",
+    "length":         "medium",
+    "format":         "bullets",       # must be "paragraph" or "bullets"
+    "extractiveness": "high",
+}
+
+SUMMARY_WORKERS = 8       # chunks in flight at once (raised to the backend's batch needs)
+API_RATE        = 2.0     # Cohere calls per second (token-bucket refill)
+MAX_RETRIES     = 5
+BOOKS_IN_FLIGHT = 16      # books queued ahead of the writer
+CHUNK_WINDOW    = None    # chunks of one book queued at a time (None = the pool's width)
+
+# Long books: "sample" summarizes MAX_CHUNKS_PER_BOOK evenly spaced chunks,
+# "reduce" summarizes every chunk and then re-summarizes the summaries
+# (map-reduce) until at most MAX_CHUNKS_PER_BOOK bullets remain.
+CHUNK_CHARS         = chunker.CHUNK_CHARS
+MAX_CHUNKS_PER_BOOK = 5
+LONG_TEXT_MODE      = "sample"
 
 # ————————————————
 # Helpers
 # ————————————————
-def split_text_into_parts(text, num_parts=5, min_len=250):
-    """Return a list of ≥min_len chunks, up to num_parts, merging small remainders."""
-    text = text.strip()
-    if len(text) < min_len:
-        return []
-    part_size = max(len(text)//num_parts, min_len)
-    raw = [text[i*part_size:(i+1)*part_size] for i in range(num_parts)]
-    merged, buff = [], ""
-    for chunk in raw:
-        buff += chunk
-        if len(buff) >= min_len:
-            merged.append(buff)
-            buff = ""
-    if buff:
-        merged.append(buff)
-    return merged
-
-def summarize_chunk(chunk, max_retries=3):
-    """Call Cohere.summarize(), retry on 429, catch everything."""
+_backend      = None
+_backend_lock = threading.Lock()
+
+def get_cohere():
+    global co
+    if co is None:
+        import cohere
+        api_key = os.getenv("COHERE_API_KEY")
+        if not api_key:
+            raise RuntimeError("[ERROR] Missing COHERE_API_KEY environment variable!")
+        co = cohere.Client(api_key)
+    return co
+
+def get_summarizer() -> summarizers.Summarizer:
+    """The configured SUMMARY_BACKEND, built once."""
+    global _backend
+    with _backend_lock:
+        if _backend is None or _backend.name != SUMMARY_BACKEND:
+            if SUMMARY_BACKEND == "cohere":
+                _backend = summarizers.CohereSummarizer(get_cohere, SUMMARY_PARAMS)
+            elif SUMMARY_BACKEND == "transformers":
+                _backend = summarizers.create(SUMMARY_BACKEND, threads=LOCAL_THREADS)
+            else:
+                _backend = summarizers.create(SUMMARY_BACKEND)
+    return _backend
+
+def chunk_chars() -> int:
+    """CHUNK_CHARS, capped at what the configured backend reads in full."""
+    return min(CHUNK_CHARS, get_summarizer().max_chars or CHUNK_CHARS)
+
+def split_text_into_parts(text, max_chars=None, min_len=chunker.MIN_CHUNK_CHARS):
+    """Return ≥min_len chunks covering the whole text, cut on paragraph/sentence ends.
+
+    `text` may be a string or an iterable of pieces; Gutenberg licence
+    boilerplate is stripped first.  `max_chars` defaults to chunk_chars().
+    """
+    return list(chunker.iter_chunks(text, max_chars or chunk_chars(), min_len))
+
+def book_chunks(book, mode=None, max_chunks=None):
+    """Lazily chunk a stored book's text (sampled in "sample" mode)."""
+    mode = mode or LONG_TEXT_MODE
+    max_chunks = max_chunks or MAX_CHUNKS_PER_BOOK
+    chunks = lambda: chunker.iter_chunks(book_store.iter_text(book), chunk_chars())
+    if mode == "sample":
+        # counting pass first, so the picks span the whole book in O(k) memory
+        total = sum(1 for _ in chunks())
+        return chunker.sample_chunks(chunks(), max_chunks, total)
+    return chunks()
+
+def _is_rate_limited(exc) -> bool:
+    return getattr(exc, "status_code", None) == 429 or "429" in str(exc)
+
+def summarize_chunk(chunk, max_retries=MAX_RETRIES, limiter=None, stats=None):
+    """Summarize with the configured backend, retry on 429 with jittered backoff, catch everything.
+
+    `limiter` paces remote (Cohere) calls across threads; `stats` collects per-call latency.
+    """
+    backend = get_summarizer()
+    limiter = limiter if backend.remote else None
+    span = "cohere_call" if backend.remote else "summarize_local"
     for attempt in range(1, max_retries+1):
+        if limiter:
+            limiter.acquire()
+        started = time.perf_counter()
         try:
-            r = co.summarize(
-                text=chunk,
-                model="summarize-xlarge",
-                length="medium",
-                format="bullets",       # must be "paragraph" or "bullets"
-                extractiveness="high"
-            )
-            return r.summary
+            with metrics.span(span, backend=backend.name):
+                summary = backend.summarize(chunk)
+            if stats:
+                stats.record(time.perf_counter() - started)
+            if limiter:
+                limiter.success()
+            return summary
         except Exception as e:
             msg = str(e)
-            if "429" in msg and attempt < max_retries:
-                wait = 5 * attempt
-                print(f"[WARN] Rate-limit hit. Sleeping {wait}s (retry {attempt})")
-                time.sleep(wait)
+            if _is_rate_limited(e) and attempt < max_retries:
+                wait = rate_limit.backoff_delay(attempt, e)
+                if stats:
+                    stats.record_retry()
+                metrics.incr("retries", service="cohere")
+                print(f"[WARN] Rate-limit hit. Sleeping {wait:.1f}s (retry {attempt})")
+                if limiter:
+                    limiter.throttle(wait)    # limiter.acquire() does the waiting
+                else:
+                    time.sleep(wait)
                 continue
             print(f"[WARN] Summarization failed: {msg}")
             return None
     return None
 
+def summarize_chunk_cached(chunk, max_retries=MAX_RETRIES, limiter=None, stats=None):
+    """summarize_chunk() behind the persistent summary cache."""
+    key = summary_cache.cache_key(chunk, get_summarizer().params())
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = summarize_chunk(chunk, max_retries, limiter, stats)
+        if summary:
+            summary_cache.put(key, summary)
+    return summary
+
+def write_stats(run_stats: dict):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(STATS_PATH, "w", encoding="utf-8") as f:
+        json.dump(run_stats, f, indent=2)
+
+def reduce_summaries(pool, bullets, max_chunks, limiter=None, stats=None):
+    """Map-reduce step: re-summarize joined summaries until ≤ max_chunks remain."""
+    while len(bullets) > max_chunks:
+        joined = "\n\n".join(bullets)
+        size = min(chunk_chars(), max(len(joined) // max_chunks + 1, chunker.MIN_CHUNK_CHARS))
+        parts = split_text_into_parts(joined, size)
+        if not parts or len(parts) >= len(bullets):
+            break
+        bullets = [s for s in ChunkWindow(parts, pool, chunk_window(), limiter, stats) if s]
+    return bullets
+
+class SummaryStats:
+    """Thread-safe call latencies / retry counts for the end-of-run report."""
+
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.latencies = []
+        self.retries   = 0
+        self.started   = time.perf_counter()
+
+    def record(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        lat = sorted(self.latencies)
+        if not lat:
+            print("[INFO] Summaries → no API calls made")
+            return
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]
+        print(f"[INFO] Summaries → {len(lat)} chunks in {elapsed:.1f}s "
+              f"({len(lat) / elapsed:.2f} chunks/s, {self.retries} retries); "
+              f"latency p50={pct(0.50):.2f}s p90={pct(0.90):.2f}s p99={pct(0.99):.2f}s")
+
+def summary_input_hash(book) -> str:
+    """Everything that decides a book's summaries: its text and the settings."""
+    return manifest.input_hash(
+        manifest.text_hash(book_store.iter_text(book)),
+        get_summarizer().params(), chunk_chars(), MAX_CHUNKS_PER_BOOK, LONG_TEXT_MODE,
+    )
+
+def _previous_summaries() -> dict:
+    """Summary records from the last run and from an interrupted one, by book ID."""
+    done = {}
+    for path in (SUMMARY_PATH, SUMMARY_PATH + ".tmp", SUMMARY_PATH + ".stream"):
+        for rec in book_store.iter_records(path):
+            if rec.get("id"):
+                done[rec["id"]] = rec
+    return done
+
+def reusable_record(book, digest, previous):
+    """The book's last summary record if its inputs are unchanged, else None."""
+    bid = book_store.book_id(book)
+    if previous and bid in previous and manifest.is_done(bid, "summarize", digest):
+        return previous[bid]
+    return None
+
+class ChunkWindow:
+    """One book's chunk summaries, with at most `size` chunks queued on `pool`.
+
+    Chunks are drawn from the lazy chunk iterator only as summaries are
+    consumed, so a long book in "reduce" mode holds `size` chunks of text
+    and its summaries so far, never the whole book.
+    """
+
+    def __init__(self, chunks, pool, size, limiter=None, stats=None):
+        self.chunks   = iter(chunks)
+        self.pool     = pool
+        self.size     = max(1, size)
+        self.limiter  = limiter
+        self.stats    = stats
+        self.futures  = deque()
+        self._fill()
+
+    def _fill(self):
+        while len(self.futures) < self.size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return
+            self.futures.append(self.pool.submit(summarize_chunk_cached, chunk, MAX_RETRIES,
+                                                 self.limiter, self.stats))
+
+    def __bool__(self):
+        return bool(self.futures)
+
+    def __iter__(self):
+        """Summaries in chunk order (None for a failed chunk)."""
+        while self.futures:
+            future = self.futures.popleft()
+            self._fill()                    # keep the pool fed while we wait
+            yield future.result()
+
+def chunk_window() -> int:
+    return CHUNK_WINDOW or max(1, SUMMARY_WORKERS, get_summarizer().concurrency)
+
+def submit_book(book, pool, limiter=None, stats=None):
+    """Start one book's chunks on `pool`; returns its ChunkWindow (None if too short)."""
+    window = ChunkWindow(book_chunks(book), pool, chunk_window(), limiter, stats)
+    if not window:
+        print(f"[WARN] Skipping '{book.get('title', 'Untitled')}'—text too short.")
+        return None
+    return window
+
+def finish_book(book, digest, window, pool, limiter=None, stats=None):
+    """Collect a book's chunk summaries (in order) into its record; None if all failed."""
+    title = book.get("title", "Untitled")
+    bullets = []
+    for idx, summary in enumerate(window, 1):
+        if summary:
+            bullets.append(summary)
+        else:
+            print(f"[WARN] Chunk {idx} for '{title}' failed.")
+    if LONG_TEXT_MODE == "reduce":
+        bullets = reduce_summaries(pool, bullets, MAX_CHUNKS_PER_BOOK, limiter, stats)
+    if not bullets:
+        return None
+    bid = book_store.book_id(book)
+    manifest.mark_done(bid, "summarize", digest, bullets=len(bullets))
+    return {
+        "id":        bid,
+        "title":     title,
+        "authors":   book.get("authors", []),
+        "summaries": bullets
+    }
+
+def summarize_book(book, pool, limiter=None, stats=None, previous=None):
+    """Summarize one stored book (streaming pipeline); returns (record, reused).
+
+    The book's chunks run on `pool`; an up-to-date record from `previous`
+    is returned as-is.  `record` is None when the book could not be
+    summarized.
+    """
+    digest = summary_input_hash(book)
+    record = reusable_record(book, digest, previous)
+    if record is not None:
+        return record, True
+    window = submit_book(book, pool, limiter, stats)
+    return (finish_book(book, digest, window, pool, limiter, stats) if window else None), False
+
 # ————————————————
 # Main
 # ————————————————
-def summarize_books():
+def summarize_books(workers=None, rate=None):
+    """Summarize every stored book, sending chunks from many books in parallel.
+
+    Chunks go to a pool of `workers` threads (default SUMMARY_WORKERS)
+    paced by one shared token bucket (`rate` calls/s, default API_RATE).
+    Books are written back in input order with their chunk summaries in
+    original order.  Books whose text and settings are unchanged since their
+    last summary (per the stage manifest) are copied over without any API
+    call.
+    """
     if not os.path.exists(BOOK_PATH):
         print(f"[ERROR] {BOOK_PATH} not found. Run fetch_books.py first.")
         return
 
-    with open(BOOK_PATH, "r", encoding="utf-8") as f:
-        books = json.load(f)
-
-    results = []
-    for book in books:
-        title = book.get("title", "Untitled")
-        text  = book.get("full_text", "").strip()
-        print(f"[INFO] Summarizing '{title}' ({len(text)} chars)")
-
-        parts = split_text_into_parts(text)
-        if not parts:
-            print(f"[WARN] Skipping '{title}'—text too short.")
-            continue
-
-        bullets = []
-        for idx, chunk in enumerate(parts, 1):
-            summary = summarize_chunk(chunk)
-            if summary:
-                bullets.append(summary)
+    workers = SUMMARY_WORKERS if workers is None else workers
+    limiter = rate_limit.TokenBucket(API_RATE if rate is None else rate)
+    stats   = SummaryStats()
+    summary_cache.reset_stats()
+
+    # summaries are written one line per book as soon as they are ready
+    previous = _previous_summaries()
+    tmp = SUMMARY_PATH + ".tmp"
+    book_store.reset(tmp)
+    written = reused = 0
+
+    def write_book(book, digest, record, window):
+        if record is None:
+            record = finish_book(book, digest, window, pool, limiter, stats)
+        if record is None:
+            return 0
+        book_store.append_records(tmp, [record])
+        return 1
+
+    pending = deque()                       # (book, digest, reused record, ChunkWindow)
+    with ThreadPoolExecutor(max_workers=max(1, workers, get_summarizer().concurrency)) as pool:
+        for book in book_store.iter_books(BOOK_PATH):
+            digest = summary_input_hash(book)
+            record = reusable_record(book, digest, previous)
+            if record is not None:
+                pending.append((book, digest, record, None))
+                reused += 1
             else:
-                print(f"[WARN] Chunk {idx} for '{title}' failed.")
+                print(f"[INFO] Summarizing '{book.get('title', 'Untitled')}' "
+                      f"({book.get('text_chars', '?')} chars)")
+                window = submit_book(book, pool, limiter, stats)
+                if window is None:
+                    continue
+                pending.append((book, digest, None, window))
+            while len(pending) > BOOKS_IN_FLIGHT:
+                written += write_book(*pending.popleft())
 
-        if bullets:
-            results.append({
-                "title":     title,
-                "authors":   book.get("authors", []),
-                "summaries": bullets
-            })
+        while pending:
+            written += write_book(*pending.popleft())
+    manifest.flush()
 
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(SUMMARY_PATH, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    print(f"[INFO] Wrote {len(results)} summarized books to {SUMMARY_PATH}")
+    os.replace(tmp, SUMMARY_PATH)
+    summary_cache.flush()
+    cache_stats = summary_cache.stats()
+    write_stats({"books": written, "api_calls": len(stats.latencies), **cache_stats})
+    print(f"[INFO] Wrote {written} summarized books to {SUMMARY_PATH} ({reused} up to date)")
+    print(f"[INFO] Summary cache → hit rate {cache_stats['hit_rate']:.0%}, "
+          f"{cache_stats['api_calls_saved']} API calls saved")
+    stats.report()
+    return written
 
 if __name__ == "__main__":
-    summarize_books()
+    with metrics.instrumented("summarize"):
+        summarize_books()
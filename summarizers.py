@@ -0,0 +1,264 @@
+"""
+Pluggable chunk summarizers behind ``summarize.summarize_chunk``.
+
+    cohere        – the hosted Cohere summarize endpoint (rate limited, retried)
+    transformers  – a local seq2seq model on CPU; chunks arriving from many
+                    threads are gathered into length-sorted batches so each
+                    forward pass serves several chunks
+    extractive    – TF-IDF + TextRank sentence scoring in NumPy; no model,
+                    no network, thousands of chunks per second
+
+Every backend returns Cohere-style bullet text ("- sentence" per line) so
+the voice and video stages do not care which one produced it.
+"""
+
+import re
+import math
+import queue
+import threading
+from concurrent.futures import Future
+
+import chunker
+
+# ——————————————————————————————————————————————————————————————
+# Configuration
+# ——————————————————————————————————————————————————————————————
+LOCAL_MODEL       = "sshleifer/distilbart-cnn-12-6"
+LOCAL_BATCH       = 8          # chunks per forward pass
+LOCAL_BATCH_WAIT  = 0.05       # seconds to wait for a batch to fill up
+LOCAL_BATCH_TOKENS = 8 * 1024  # padded tokens per forward pass (longest × batch size)
+LOCAL_MAX_INPUT   = 1024       # tokens the model sees per chunk
+LOCAL_MAX_CHARS   = 3_500      # chunk size that stays within LOCAL_MAX_INPUT for English prose
+LOCAL_MAX_OUTPUT  = 142
+EXTRACTIVE_SENTENCES = 3
+
+def as_bullets(sentences) -> str:
+    return "\n".join(f"- {s.strip()}" for s in sentences if s.strip())
+
+def split_sentences(text: str) -> list[str]:
+    text = " ".join(text.split())
+    return [s.strip() for s in chunker.SENTENCE_END.split(text) if len(s.strip()) > 1]
+
+# ——————————————————————————————————————————————————————————————
+# Interface
+# ——————————————————————————————————————————————————————————————
+class Summarizer:
+    """One chunk in, bullet text out.
+
+    `remote` backends go through the API token bucket and 429 retries in
+    summarize_chunk; `concurrency` is how many chunks the caller should keep
+    in flight for the backend to be busy; `max_chars` is the longest chunk
+    the backend reads in full (None = no limit of its own), which the
+    caller chunks to.
+    """
+    name        = "base"
+    remote      = False
+    concurrency = 1
+    max_chars   = None
+
+    def params(self) -> dict:
+        """Settings that change the output – part of the summary cache key."""
+        return {"backend": self.name}
+
+    def summarize(self, chunk: str) -> str:
+        return self.summarize_batch([chunk])[0]
+
+    def summarize_batch(self, chunks: list) -> list:
+        return [self.summarize(c) for c in chunks]
+
+class CohereSummarizer(Summarizer):
+    name   = "cohere"
+    remote = True
+
+    def __init__(self, client, params: dict):
+        self._client = client           # callable returning a cohere.Client
+        self._params = params
+
+    def params(self) -> dict:
+        return self._params             # unchanged, so existing cache entries stay valid
+
+    def summarize(self, chunk: str) -> str:
+        return self._client().summarize(text=chunk, **self._params).summary
+
+# ——————————————————————————————————————————————————————————————
+# Extractive: TF-IDF sentence vectors + TextRank
+# ——————————————————————————————————————————————————————————————
+_WORD = re.compile(r"[a-z][a-z']+")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her his i if in into is it its
+me my no not of on or our she so than that the their them then there these they this
+to was we were what when which who will with would you your
+""".split())
+
+def textrank(sentences: list, k: int, damping: float = 0.85, iterations: int = 30) -> list:
+    """Indices of the `k` most central sentences, in document order."""
+    import numpy as np
+    if len(sentences) <= k:
+        return list(range(len(sentences)))
+    vocab, rows, cols = {}, [], []
+    for i, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            if word not in _STOPWORDS:
+                rows.append(i)
+                cols.append(vocab.setdefault(word, len(vocab)))
+    if not vocab:
+        return list(range(k))
+    tf = np.zeros((len(sentences), len(vocab)), dtype=np.float32)
+    np.add.at(tf, (rows, cols), 1.0)
+    idf = np.log((1 + len(sentences)) / (1 + (tf > 0).sum(axis=0))) + 1
+    vec = tf * idf
+    vec /= np.linalg.norm(vec, axis=1, keepdims=True) + 1e-9
+    sim = vec @ vec.T
+    np.fill_diagonal(sim, 0.0)
+    sim /= sim.sum(axis=1, keepdims=True) + 1e-9
+    n = len(sentences)
+    rank = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        new = (1 - damping) / n + damping * (sim.T @ rank)
+        if np.abs(new - rank).sum() < 1e-6:
+            rank = new
+            break
+        rank = new
+    return sorted(np.argsort(-rank, kind="stable")[:k].tolist())
+
+class ExtractiveSummarizer(Summarizer):
+    name        = "extractive"
+    concurrency = 4
+
+    def __init__(self, sentences: int = EXTRACTIVE_SENTENCES):
+        self.sentences = sentences
+
+    def params(self) -> dict:
+        return {"backend": self.name, "sentences": self.sentences}
+
+    def summarize(self, chunk: str) -> str:
+        sentences = split_sentences(chunk)
+        return as_bullets(sentences[i] for i in textrank(sentences, self.sentences))
+
+# ——————————————————————————————————————————————————————————————
+# Local model with dynamic batching
+# ——————————————————————————————————————————————————————————————
+class _MicroBatcher:
+    """Collect single requests from many threads into batched calls of `fn`."""
+
+    def __init__(self, fn, max_batch: int, max_wait: float):
+        self.fn, self.max_batch, self.max_wait = fn, max_batch, max_wait
+        self.inbox = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="summarizer-batch", daemon=True)
+        self.thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self.inbox.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.inbox.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self.inbox.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            try:
+                results = self.fn([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+class TransformersSummarizer(Summarizer):
+    name      = "transformers"
+    max_chars = LOCAL_MAX_CHARS
+
+    def __init__(self, model: str = LOCAL_MODEL, threads: int = None, batch_size: int = LOCAL_BATCH,
+                 batch_tokens: int = LOCAL_BATCH_TOKENS, max_wait: float = LOCAL_BATCH_WAIT):
+        self.model_name   = model
+        self.threads      = threads
+        self.batch_size   = batch_size
+        self.batch_tokens = batch_tokens
+        self.concurrency  = batch_size * 2          # keep the next batch queued
+        self._lock        = threading.Lock()
+        self._model       = None
+        self._batcher     = _MicroBatcher(self.summarize_batch, batch_size, max_wait)
+
+    def params(self) -> dict:
+        return {"backend": self.name, "model": self.model_name, "max_chars": self.max_chars,
+                "max_input": LOCAL_MAX_INPUT, "max_output": LOCAL_MAX_OUTPUT}
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import torch
+                from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+                if self.threads:
+                    torch.set_num_threads(self.threads)
+                tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name).eval()
+                self._model = (torch, tokenizer, model)
+        return self._model
+
+    def summarize(self, chunk: str) -> str:
+        return self._batcher.submit(chunk).result()
+
+    def _batches(self, lengths: list) -> list:
+        """Group chunk indices, shortest first, so padding stays small."""
+        batches, current = [], []
+        for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+            longest = max(lengths[j] for j in current + [i])
+            if current and (len(current) == self.batch_size
+                            or longest * (len(current) + 1) > self.batch_tokens):
+                batches.append(current)
+                current = []
+            current.append(i)
+        return batches + [current] if current else batches
+
+    def _fit(self, tokenizer, chunks: list) -> tuple:
+        """Split chunks longer than LOCAL_MAX_INPUT tokens into pieces that fit.
+
+        Returns (pieces, owner) where owner[j] is the chunk piece j came from,
+        so nothing is lost to tokenizer truncation.
+        """
+        pieces, owner = [], []
+        lengths = [len(ids) for ids in tokenizer(chunks)["input_ids"]]
+        for i, (chunk, tokens) in enumerate(zip(chunks, lengths)):
+            parts = [chunk]
+            if tokens > LOCAL_MAX_INPUT:
+                n = math.ceil(tokens * 1.1 / LOCAL_MAX_INPUT)          # margin for uneven cuts
+                parts = list(chunker.iter_chunks(chunk, math.ceil(len(chunk) / n), min_len=1,
+                                                 strip_boilerplate=False)) or parts
+            pieces += parts
+            owner += [i] * len(parts)
+        return pieces, owner
+
+    def summarize_batch(self, chunks: list) -> list:
+        torch, tokenizer, model = self._load()
+        pieces, owner = self._fit(tokenizer, chunks)
+        encoded = tokenizer(pieces, truncation=True, max_length=LOCAL_MAX_INPUT)["input_ids"]
+        bullets = [[] for _ in chunks]
+        for batch in self._batches([len(ids) for ids in encoded]):
+            inputs = tokenizer.pad({"input_ids": [encoded[j] for j in batch]}, return_tensors="pt")
+            with torch.inference_mode():
+                generated = model.generate(**inputs, max_new_tokens=LOCAL_MAX_OUTPUT,
+                                           num_beams=2, early_stopping=True)
+            for j, text in zip(batch, tokenizer.batch_decode(generated, skip_special_tokens=True)):
+                bullets[owner[j]].append((j, text))
+        return [as_bullets(s for _, text in sorted(parts) for s in split_sentences(text))
+                for parts in bullets]
+
+# ——————————————————————————————————————————————————————————————
+# Registry
+# ——————————————————————————————————————————————————————————————
+BACKENDS = {
+    "cohere":       CohereSummarizer,
+    "transformers": TransformersSummarizer,
+    "extractive":   ExtractiveSummarizer,
+}
+
+def create(name: str, **options) -> Summarizer:
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown summarizer backend {name!r} (choose from {', '.join(BACKENDS)})")
+    return cls(**options)
@@ -0,0 +1,106 @@
+"""
+Persistent memo of chunk summaries.
+
+Entries are keyed by a hash of the chunk text plus the summarizer
+parameters, so a chunk is only sent to the API again when its text or the
+model settings change.  The store is a single JSON file bounded by
+``MAX_ENTRIES``; the least recently used summaries are evicted first.
+New summaries are written every FLUSH_INTERVAL seconds and at exit.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# ——————————————————————————————————————————————————————————————
+# Configuration & Paths
+# ——————————————————————————————————————————————————————————————
+CACHE_PATH     = os.path.join("data", "summary_cache.json")
+MAX_ENTRIES    = 50_000
+FLUSH_INTERVAL = 30         # seconds between writes of new summaries (and at exit)
+
+_lock    = threading.Lock()
+_entries = None             # OrderedDict, least recently used first
+_dirty   = False
+_saved   = 0.0              # time of the last write
+_stats   = {"hits": 0, "misses": 0, "evicted": 0}
+
+def _load() -> OrderedDict:
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_PATH, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        _entries = OrderedDict(sorted(stored.items(), key=lambda kv: kv[1].get("last_used", 0)))
+    return _entries
+
+def cache_key(chunk: str, params: dict) -> str:
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+def get(key: str):
+    with _lock:
+        entries = _load()
+        entry = entries.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            metrics.incr("cache_lookups", cache="summary", result="miss")
+            return None
+        entry["last_used"] = time.time()
+        entries.move_to_end(key)
+        _stats["hits"] += 1
+        metrics.incr("cache_lookups", cache="summary", result="hit")
+        return entry["summary"]
+
+def put(key: str, summary: str):
+    global _dirty
+    with _lock:
+        entries = _load()
+        entries[key] = {"summary": summary, "last_used": time.time()}
+        entries.move_to_end(key)
+        while len(entries) > MAX_ENTRIES:
+            entries.popitem(last=False)
+            _stats["evicted"] += 1
+        _dirty = True
+        if time.time() - _saved >= FLUSH_INTERVAL:
+            _flush_locked()
+
+def _flush_locked():
+    global _dirty, _saved
+    if _entries is None or not _dirty:
+        return
+    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+    tmp = CACHE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_entries, f, ensure_ascii=False)
+    os.replace(tmp, CACHE_PATH)
+    _dirty, _saved = False, time.time()
+
+def flush():
+    with _lock:
+        _flush_locked()
+
+atexit.register(flush)
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    lookups = s["hits"] + s["misses"]
+    s["api_calls_saved"] = s["hits"]
+    s["hit_rate"] = round(s["hits"] / lookups, 4) if lookups else 0.0
+    return s
+
+def reset_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
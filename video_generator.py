@@ -1,137 +1,451 @@
 """
-Generate an Instagram-Reel-ready MP4 via Creatomate,
-download it, and (optionally) hand it off for Instagram upload.
+Generate an Instagram-Reel-ready MP4 via Creatomate (or the local
+compositor with VIDEO_BACKEND=local), download it, and (optionally) hand it
+off for Instagram upload.
 """
 
-import os, json, re, sys, time, requests
-from datetime import datetime
+import os, re, sys, time, threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import asset_store
+import book_store
+import local_renderer
+import manifest
+import metrics
 
 # ────────────────────────────────────────────────────────────────
 # Config & constants
 # ────────────────────────────────────────────────────────────────
-DATA_DIR        = "data"
-SUMMARY_FILE    = os.path.join(DATA_DIR, "summaries.json")
-VIDEO_DIR       = "videos"
-os.makedirs(VIDEO_DIR, exist_ok=True)
-
-API_KEY         = os.getenv("CREATOMATE_API_KEY")
-if not API_KEY:
-    sys.exit(
-        "[ERROR] Environment variable CREATOMATE_API_KEY is missing.\n"
-        "Add it as a repo secret (Actions → Secrets → New) or `export` it locally."
-    )
-
-API_RENDER      = "https://api.creatomate.com/v1/renders"
+DATA_DIR        = book_store.DATA_DIR
+SUMMARY_FILE    = book_store.SUMMARIES_PATH
+VIDEO_DIR       = asset_store.KINDS["video"][0]           # MP4s are named by content hash
+
+# "creatomate" renders remotely; "local" composites on this machine (local_renderer)
+VIDEO_BACKEND   = os.getenv("VIDEO_BACKEND", "creatomate")
+VIDEO_PRESET    = os.getenv("VIDEO_PRESET", "final")     # local backend: "final" | "draft"
+
+API_KEY         = os.getenv("CREATOMATE_API_KEY")         # checked on first API call
+
+# point at render_stub.py (e.g. http://127.0.0.1:8765/v1/renders) to work offline
+API_RENDER      = os.getenv("CREATOMATE_API_URL", "https://api.creatomate.com/v1/renders")
 POLL_INTERVAL   = 5        # seconds
+POLL_MIN, POLL_MAX = 2, 15 # adaptive batch polling window (seconds)
+RENDER_CONCURRENCY = 4     # renders in flight at once in batch mode
+DOWNLOAD_WORKERS   = 4
+DOWNLOAD_RETRIES   = 3
+POLL_RETRIES       = 3     # consecutive transient poll errors before a render is given up
 MAX_DURATION    = 45       # sec for a Reel
 WIDTH, HEIGHT   = 1080, 1920
 
 # ────────────────────────────────────────────────────────────────
 # Helper
 # ────────────────────────────────────────────────────────────────
-def safe_name(text: str) -> str:
-    return re.sub(r'[\\/*?:"<>|()\']', "", text.replace(" ", "_"))
+_session      = None
+_session_lock = threading.Lock()
+
+def get_session() -> "requests.Session":
+    """Keep-alive pool shared by render starts, polls and downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests                   # imported on first use to keep startup fast
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=RENDER_CONCURRENCY + DOWNLOAD_WORKERS)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
 
 def load_summary() -> tuple[str, str]:
     if not os.path.exists(SUMMARY_FILE):
-        sys.exit("[ERROR] summaries.json missing – run summarize.py first.")
-    with open(SUMMARY_FILE, encoding="utf-8") as f:
-        books = json.load(f)
-    if not books:
-        sys.exit("[ERROR] summaries.json is empty.")
-    title = books[0].get("title", "Untitled")
-    summary = books[0].get("summaries", [""])[0].strip() or "No summary."
+        sys.exit(f"[ERROR] {SUMMARY_FILE} missing – run summarize.py first.")
+    book = next(book_store.iter_records(SUMMARY_FILE), None)   # only the first record is read
+    if not book:
+        sys.exit(f"[ERROR] {SUMMARY_FILE} is empty.")
+    title = book.get("title", "Untitled")
+    summary = (book.get("summaries") or [""])[0].strip() or "No summary."
     return title, summary
 
 # ────────────────────────────────────────────────────────────────
 # Creatomate API helpers  – patched to accept 202 + array payload
 # ────────────────────────────────────────────────────────────────
 MAX_WAIT_SEC   = 15 * 60   # 15-minute safety cap
-DOT_INTERVAL   = 15        # seconds between “still waiting …” dots
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Content-Type": "application/json"
-}
-r = requests.post(API_RENDER + "?wait=true", json=payload, headers=headers, timeout=30)
-
-if r.status_code not in (200, 202):
-    sys.exit(f"[ERROR] Creatomate render start failed {r.status_code}: {r.text}")
-
-data = r.json()
-if isinstance(data, list):  # Sometimes API returns a list
-    data = data[0]
-
-render_id = data.get("id")
-def start_render(prompt: str) -> str:
-    ...
-    data = r.json()
-    if isinstance(data, list):
-        data = data[0]  # Ensure we extract a valid render object
+TEMPLATE_REV   = 1         # bump when build_payload() changes (invalidates renders)
+
+class RenderError(RuntimeError):
+    """A render could not be started, failed remotely or timed out.
 
+    `transient` marks errors worth retrying (429 / 5xx answers).
+    """
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = status_code == 429 or (status_code or 0) >= 500
+
+def _auth_headers() -> dict:
+    if not API_KEY:
+        raise RenderError(
+            "Environment variable CREATOMATE_API_KEY is missing.\n"
+            "Add it as a repo secret (Actions → Secrets → New) or `export` it locally."
+        )
+    return {"Authorization": f"Bearer {API_KEY}"}
+
+def _unwrap(data):
+    # Sometimes the API returns a list of render objects
+    return data[0] if isinstance(data, list) else data
+
+def build_payload(title: str, summary: str) -> dict:
+    """Creatomate source: a vertical Reel with the title over the summary."""
+    return {
+        "source": {
+            "output_format": "mp4",
+            "width":         WIDTH,
+            "height":        HEIGHT,
+            "duration":      MAX_DURATION,
+            "elements": [
+                {"type": "text", "text": title, "y": "15%", "width": "85%",
+                 "font_size": "8 vmin", "font_weight": "700", "fill_color": "#ffffff"},
+                {"type": "text", "text": summary, "y": "55%", "width": "85%",
+                 "font_size": "5 vmin", "fill_color": "#ffffff"},
+            ],
+        }
+    }
+
+def start_render(payload: dict) -> str:
+    headers = {
+        **_auth_headers(),
+        "Content-Type": "application/json"
+    }
+    with metrics.span("render_start"):
+        r = get_session().post(API_RENDER, json=payload, headers=headers, timeout=30)
+    if r.status_code not in (200, 202):
+        raise RenderError(f"Creatomate render start failed {r.status_code}: {r.text}", r.status_code)
+
+    data = _unwrap(r.json())  # Ensure we extract a valid render object
     render_id = data.get("id")
     if not render_id or not re.match(r"^[0-9a-fA-F-]{36}$", render_id):
-        sys.exit(f"[ERROR] Received invalid render ID: {render_id}")
+        raise RenderError(f"Received invalid render ID: {render_id}")
 
     print(f"[INFO] Render queued, id={render_id}")
     return render_id
 
-def poll_render(render_id: str) -> str:
+def fetch_render(render_id: str) -> dict:
+    """One status request for a render."""
     if not re.match(r"^[0-9a-fA-F-]{36}$", render_id):
-        sys.exit(f"[ERROR] Invalid render ID format: {render_id}")
+        raise RenderError(f"Invalid render ID format: {render_id}")
 
-    url = f"{API_RENDER}/{render_id}"
-    headers = {"Authorization": f"Bearer {API_KEY}"}
+    headers = _auth_headers()
+    with metrics.span("render_poll"):
+        r = get_session().get(f"{API_RENDER}/{render_id}", headers=headers, timeout=30)
+    if r.status_code == 400:
+        raise RenderError(f"Invalid render ID: {render_id} (Must be a UUID)")
+    if r.status_code != 200:
+        raise RenderError(f"Poll failed {r.status_code}: {r.text}", r.status_code)
+    return _unwrap(r.json())  # Ensure we process the first item
 
-    waited = 0
-    while waited < MAX_WAIT_SEC:
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.status_code == 400:
-            sys.exit(f"[ERROR] Invalid render ID: {render_id} (Must be a UUID)")
+def download_file(file_url: str, out_path: str):
+    """Download to `<out_path>.part`, resuming with Range requests after a drop."""
+    import requests
+    print(f"[INFO] Downloading: {file_url}")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    part = out_path + ".part"
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={have}-"} if have else {}
+        try:
+            with metrics.span("render_download"), \
+                    get_session().get(file_url, headers=headers, stream=True, timeout=60) as r:
+                if r.status_code == 416:          # .part already complete
+                    break
+                r.raise_for_status()
+                mode = "ab" if have and r.status_code == 206 else "wb"
+                with open(part, mode) as f:
+                    for chunk in r.iter_content(64 * 1024):
+                        f.write(chunk)
+                        metrics.incr("bytes_downloaded", len(chunk), host="render")
+            break
+        except requests.RequestException as e:
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            metrics.incr("retries", service="render_download")
+            print(f"[WARN] Download interrupted ({e}); resuming (retry {attempt})")
+    os.replace(part, out_path)
+    print(f"[INFO] Saved to {out_path}")
+    return out_path
 
-        if r.status_code != 200:
-            sys.exit(f"[ERROR] Poll failed {r.status_code}: {r.text}")
+# ────────────────────────────────────────────────────────────────
+# Per-book render (resumable via the stage manifest)
+# ────────────────────────────────────────────────────────────────
+def book_summary(book: dict) -> tuple[str, str]:
+    title = book.get("title", "Untitled")
+    summary = (book.get("summaries") or [""])[0].strip() or "No summary."
+    return title, summary
 
-        data = r.json()
-        if isinstance(data, list):  
-            data = data[0]  # Ensure we process the first item
+def video_input_hash(book: dict) -> str:
+    """Asset key of the book's Reel: summary + template (+ narration for local renders)."""
+    if VIDEO_BACKEND == "local":
+        audio = asset_store.book_keys(book_store.book_id(book), "audio")
+        backend = (VIDEO_BACKEND, VIDEO_PRESET, audio)
+    else:
+        backend = VIDEO_BACKEND
+    return asset_store.asset_key("video", *book_summary(book), TEMPLATE_REV, WIDTH, HEIGHT,
+                                 MAX_DURATION, backend)
 
-        status = data.get("status")
-        if status == "finished":
-            print(f"\n[INFO] Render finished in {waited} s", flush=True)
-            return data["url"]
-        if status in {"failed", "cancelled"}:
-            sys.exit(f"[ERROR] Render {status}: {data}")
+def voice_files(book: dict) -> list[str]:
+    """The book's narration MP3s, in part order."""
+    bid = book_store.book_id(book)
+    paths = asset_store.book_paths(bid, "audio")
+    if paths:
+        return paths
+    done = manifest.get(bid, "voice")
+    return list(done.get("files") or []) if done else []
 
-        print(".", end="", flush=True)
-        time.sleep(DOT_INTERVAL)
-        waited += DOT_INTERVAL
+def local_job(book: dict) -> dict:
+    """Arguments for local_renderer.render_local for one book."""
+    return {
+        "key":    book_store.book_id(book),
+        "kwargs": {
+            "book":         book,
+            "out_path":     video_path(book),
+            "audio_paths":  voice_files(book),
+            "width":        WIDTH,
+            "height":       HEIGHT,
+            "max_duration": MAX_DURATION,
+            "preset":       VIDEO_PRESET,
+        },
+    }
 
-    sys.exit("[ERROR] Render timeout: >30 min")
+def render_book(book: dict) -> str:
+    """Render, poll and download one book's Reel; returns the MP4 path.
 
-def download_file(file_url: str, out_path: str):
-    print(f"[INFO] Downloading: {file_url}")
-    with requests.get(file_url, stream=True) as r:
-        r.raise_for_status()
-        with open(out_path, "wb") as f:
-            for chunk in r.iter_content(8192):
-                f.write(chunk)
-    print(f"[INFO] Saved to {out_path}")
+    An identical Reel already in the asset store is returned without
+    rendering.  Creatomate renders go through the shared RenderPoller, so
+    concurrent callers (the streaming pipeline's video workers) share
+    RENDER_CONCURRENCY and the adaptive poll intervals.
+    """
+    out_file = video_path(book)
+    if os.path.exists(out_file):
+        return out_file
+    if VIDEO_BACKEND == "local":
+        return local_renderer.render_local(**local_job(book)["kwargs"])
+    video_url = _poller.submit(book).result()
+    download_file(video_url, out_file)
+    return out_file
+
+def video_path(book: dict) -> str:
+    """Where the book's Reel lives in the asset store (named by its input hash)."""
+    return asset_store.path("video", video_input_hash(book))
+
+# ────────────────────────────────────────────────────────────────
+# Render poller – every Creatomate render in the process, one thread
+# ────────────────────────────────────────────────────────────────
+class RenderPoller:
+    """Start and track Creatomate renders on one background thread.
+
+    ``submit(book)`` returns a Future for the finished render's video URL.
+    Up to `concurrency` renders (default RENDER_CONCURRENCY) are in flight;
+    later ones wait their turn.  Each render is re-checked after its own
+    interval, which starts at POLL_MIN, grows ×1.5 up to POLL_MAX while the
+    status is unchanged and resets whenever it changes.  A poll answered
+    with a non-transient error (bad ID, 404, …) fails the render at once;
+    network errors and 429 / 5xx answers are retried on the same backoff up
+    to POLL_RETRIES times in a row.  The thread exits when it has nothing
+    to do and is restarted by the next submit.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency
+        self.cond        = threading.Condition()
+        self.waiting     = deque()      # (book, future) not started yet
+        self.inflight    = {}           # render_id → {book, future, status, interval, due, ...}
+        self.thread      = None
+
+    def submit(self, book: dict) -> Future:
+        future = Future()
+        with self.cond:
+            self.waiting.append((book, future))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="render-poller", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        return future
+
+    def _limit(self) -> int:
+        return max(1, self.concurrency or RENDER_CONCURRENCY)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.waiting and not self.inflight:
+                    self.thread = None
+                    return
+                starts = []
+                while self.waiting and len(self.inflight) + len(starts) < self._limit():
+                    starts.append(self.waiting.popleft())
+            try:
+                for book, future in starts:
+                    self._start(book, future)
+                if not self.inflight:
+                    continue
+                nap = min(r["due"] for r in self.inflight.values()) - time.monotonic()
+                if nap > 0:
+                    with self.cond:             # a new submit may fill a free slot meanwhile
+                        if not (self.waiting and len(self.inflight) < self._limit()):
+                            self.cond.wait(nap)
+                self._poll()
+            except Exception as e:              # never leave a caller waiting forever
+                for future in [r["future"] for r in self.inflight.values()] + [f for _, f in starts]:
+                    if not future.done():
+                        future.set_exception(e)
+                self.inflight.clear()
+
+    def _start(self, book: dict, future: Future):
+        import requests
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            rid = start_render(build_payload(*book_summary(book)))
+        except (RenderError, requests.RequestException) as e:
+            future.set_exception(e)
+            return
+        now = time.monotonic()
+        self.inflight[rid] = {"book": book, "future": future, "status": None, "interval": POLL_MIN,
+                              "due": now + POLL_MIN, "started": now, "errors": 0}
+
+    def _poll(self):
+        """Check every render that is due; settle the finished and failed ones."""
+        import requests
+        now = time.monotonic()
+        for rid, r in list(self.inflight.items()):
+            if r["due"] > now:
+                continue
+            title = r["book"].get("title", "Untitled")
+            try:
+                data = fetch_render(rid)
+                r["errors"] = 0
+            except (RenderError, requests.RequestException) as e:
+                r["errors"] += 1
+                if isinstance(e, RenderError) and not e.transient or r["errors"] > POLL_RETRIES:
+                    del self.inflight[rid]
+                    r["future"].set_exception(RenderError(f"poll error: {e}",
+                                                          getattr(e, "status_code", None)))
+                    continue
+                print(f"[WARN] Poll failed for '{title}' (attempt {r['errors']}/{POLL_RETRIES}): {e}")
+                metrics.incr("retries", service="render_poll")
+                r["interval"] = min(POLL_MAX, r["interval"] * 1.5)
+                r["due"] = now + r["interval"]
+                continue
+            status = data.get("status")
+            if status == "finished":
+                del self.inflight[rid]
+                print(f"[INFO] Render finished for '{title}' in {now - r['started']:.0f}s")
+                r["future"].set_result(data["url"])
+                continue
+            if status in {"failed", "cancelled"} or now - r["started"] > MAX_WAIT_SEC:
+                del self.inflight[rid]
+                r["future"].set_exception(RenderError(f"Render {status or 'timeout'}: {data}"))
+                continue
+            if status != r["status"]:
+                r["status"], r["interval"] = status, POLL_MIN
+            else:
+                r["interval"] = min(POLL_MAX, r["interval"] * 1.5)
+            r["due"] = now + r["interval"]
+
+_poller = RenderPoller()      # shared by render_book (streaming pipeline) and render_batch
+
+# ────────────────────────────────────────────────────────────────
+# Batch mode – many renders, one poller, parallel downloads
+# ────────────────────────────────────────────────────────────────
+def render_batch(books: list, concurrency: int = None) -> dict:
+    """Render many books at once; returns {book_id: mp4 path} for the successes.
+
+    Renders go through the shared RenderPoller (a private one when
+    `concurrency` is given); each finished render is downloaded on a
+    separate pool while the others are still being polled.
+    """
+    import requests
+    poller = _poller if concurrency is None else RenderPoller(concurrency)
+    results, downloads = {}, {}
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        renders = {poller.submit(book): book for book in books}
+        for future in as_completed(renders):
+            book = renders[future]
+            try:
+                url = future.result()
+            except (RenderError, requests.RequestException) as e:
+                print(f"[WARN] Render failed for '{book.get('title', 'Untitled')}': {e}")
+                continue
+            downloads[book_store.book_id(book)] = pool.submit(download_file, url, video_path(book))
+
+        for bid, future in downloads.items():
+            try:
+                results[bid] = future.result()
+            except (OSError, requests.RequestException) as e:
+                print(f"[WARN] Download failed for {bid}: {e}")
+    return results
+
+def ensure_video(book: dict) -> tuple[str, bool]:
+    """Render one book unless the asset store has its Reel; returns (path, reused)."""
+    bid    = book_store.book_id(book)
+    digest = video_input_hash(book)
+    reused = asset_store.has("video", digest)
+    out_file = render_book(book)
+    asset_store.link(bid, "video", [digest], book.get("title"))
+    manifest.mark_done(bid, "video", digest, file=out_file)
+    return out_file, reused
+
+def generate_videos(summary_file: str = SUMMARY_FILE, concurrency: int = None):
+    """Batch-render a Reel for every summarized book that has no up-to-date video."""
+    if not os.path.exists(summary_file):
+        print(f"[ERROR] Missing {summary_file}. Run summarize.py first.")
+        return []
+    if VIDEO_BACKEND != "local" and not API_KEY:
+        print("[ERROR] CREATOMATE_API_KEY is missing – set it or use VIDEO_BACKEND=local.")
+        return []
+
+    videos, todo = [], []
+    for book in book_store.iter_records(summary_file):
+        digest = video_input_hash(book)
+        if asset_store.has("video", digest):
+            asset_store.link(book_store.book_id(book), "video", [digest], book.get("title"))
+            videos.append(asset_store.path("video", digest))
+        else:
+            todo.append(book)
+    skipped = len(videos)
+
+    if VIDEO_BACKEND == "local":
+        rendered = local_renderer.render_many([local_job(b) for b in todo])
+    else:
+        rendered = render_batch(todo, concurrency) if todo else {}
+    for book in todo:
+        bid = book_store.book_id(book)
+        if bid in rendered:
+            digest = video_input_hash(book)
+            asset_store.link(bid, "video", [digest], book.get("title"))
+            manifest.mark_done(bid, "video", digest, file=rendered[bid])
+            videos.append(rendered[bid])
+
+    print(f"[INFO] Videos → {len(videos)} ready ({skipped} already up to date)")
+    return videos
 
 # ────────────────────────────────────────────────────────────────
 # Main
 # ────────────────────────────────────────────────────────────────
 def main():
+    if "--batch" in sys.argv:
+        generate_videos()
+        return
     title, summary = load_summary()
-    prompt = f"Instagram Reel visualising the summary:\n{summary}"
-    render_id = start_render(prompt)
-    video_url = poll_render(render_id)
-
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_file = os.path.join(VIDEO_DIR, f"{safe_name(title)}_{ts}.mp4")
-    download_file(video_url, out_file)
+    try:
+        out_file = render_book({"title": title, "summaries": [summary]})
+    except RenderError as e:
+        sys.exit(f"[ERROR] {e}")
 
     print("[SUCCESS] Reel ready:", out_file)
     # TODO: upload via Instagram Graph API
 
 if __name__ == "__main__":
-    main()
+    with metrics.instrumented("video_generator"):
+        main()
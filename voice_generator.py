@@ -1,53 +1,143 @@
-# voice_generator.py  – self-installing gTTS + random voices
-import os, json, re, random, subprocess, sys
+# voice_generator.py  – gTTS + seeded random voices, pooled & cached
+import os, io, random, threading
+from concurrent.futures import ThreadPoolExecutor
 
-# ------------------------------------------------------------------
-# Make sure gTTS is available
-# ------------------------------------------------------------------
-try:
-    from gtts import gTTS
-except ModuleNotFoundError:
-    print("[WARN] gTTS not found. Installing…")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet", "gTTS"])
-    from gtts import gTTS
+import asset_store
+import book_store
+import chunker
+import manifest
+import metrics
 
 # ------------------------------------------------------------------
-DATA_DIR   = "data"
-SUMMARY_FP = os.path.join(DATA_DIR, "summaries.json")
-VOICE_DIR  = "voices"
+DATA_DIR   = book_store.DATA_DIR
+SUMMARY_FP = book_store.SUMMARIES_PATH
+VOICE_DIR  = asset_store.KINDS["audio"][0]                # MP3s are named by content hash
 VOICES     = ["en", "en-au", "en-uk", "en-us", "en-in"]  # random accents
+ACCENT_TLD = {"en": "com", "en-au": "com.au", "en-uk": "co.uk", "en-us": "us", "en-in": "co.in"}
+VOICE_SEED = os.getenv("VOICE_SEED", "book-automation")  # None → truly random accents
+VOICE_WORKERS = 8          # concurrent TTS requests
+TTS_MAX_CHARS = 100        # gTTS per-request limit; longer text is split on sentences
 # ------------------------------------------------------------------
 
-def sanitize(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|()\']', "", name.replace(" ", "_"))
+_pool      = None
+_pool_lock = threading.Lock()
+gTTS       = None      # gtts.gTTS, imported on first use (tests / benchmarks may assign their own)
 
-def generate_voices(summary_file: str = SUMMARY_FP, out_dir: str = VOICE_DIR):
-    if not os.path.exists(summary_file):
-        print(f"[ERROR] Missing {summary_file}. Run summarize.py first.")
-        return
+def get_tts():
+    global gTTS
+    if gTTS is None:
+        try:
+            from gtts import gTTS as tts
+        except ModuleNotFoundError:
+            raise RuntimeError("[ERROR] gTTS is not installed – run `pip install gTTS`.")
+        gTTS = tts
+    return gTTS
+
+def get_pool() -> ThreadPoolExecutor:
+    """Shared TTS worker pool (used by the batch and the streaming pipeline)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=VOICE_WORKERS, thread_name_prefix="tts")
+    return _pool
+
+def pick_voice(book_id: str, idx: int, seed=None) -> str:
+    """Accent for one summary part – reproducible for a given seed."""
+    seed = VOICE_SEED if seed is None else seed
+    if seed is None:
+        return random.choice(VOICES)
+    return random.Random(f"{seed}:{book_id}:{idx}").choice(VOICES)
+
+def synthesize_segment(text: str, voice: str) -> bytes:
+    """One gTTS request, served from the asset store when already voiced."""
+    key = asset_store.asset_key("segment", voice, text)
+    if asset_store.has("segment", key):
+        metrics.incr("cache_lookups", cache="audio", result="hit")
+        return asset_store.read("segment", key)
+    metrics.incr("cache_lookups", cache="audio", result="miss")
+    buf = io.BytesIO()
+    with metrics.span("tts_call", voice=voice):
+        get_tts()(text=text, lang=voice.split("-")[0], tld=ACCENT_TLD.get(voice, "com")).write_to_fp(buf)
+    metrics.incr("bytes_downloaded", buf.tell(), host="tts")
+    asset_store.write("segment", key, buf.getvalue())
+    return buf.getvalue()
 
-    os.makedirs(out_dir, exist_ok=True)
+def submit_text(text: str, voice: str, pool=None) -> list:
+    """Queue the TTS requests for `text`; returns futures of MP3 pieces in order.
 
-    with open(summary_file, encoding="utf-8") as f:
-        data = json.load(f)
+    The text is split into sentence-sized requests (≤ TTS_MAX_CHARS) that
+    run concurrently on the pool; MP3 frames can simply be concatenated.
+    """
+    pool = pool or get_pool()
+    segments = chunker.iter_chunks(text, TTS_MAX_CHARS, min_len=1, strip_boilerplate=False)
+    return [pool.submit(synthesize_segment, seg, voice) for seg in segments]
 
-    if not data:
-        print("[WARN] summaries.json is empty.")
+def voice_book(book: dict, pool=None) -> list[str]:
+    """Voice every summary part of one book; returns the MP3 paths, in part order.
+
+    Parts live in the asset store under hash(text, voice): a part voiced
+    before (for this or any other book) is reused as-is.  The rest are queued
+    up front so their requests share the worker pool.
+    """
+    title = book.get("title", "Untitled")
+    bid   = book_store.book_id(book)
+    jobs  = []
+    for idx, text in enumerate(book.get("summaries", []), start=1):
+        if not text.strip():
+            continue
+        voice = pick_voice(bid, idx)
+        key   = asset_store.asset_key("audio", voice, text)
+        futures = None if asset_store.has("audio", key) else submit_text(text, voice, pool)
+        jobs.append((idx, text, voice, key, futures))
+
+    keys = []
+    for idx, text, voice, key, futures in jobs:
+        try:
+            if futures is None:
+                metrics.incr("cache_lookups", cache="audio_asset", result="hit")
+            else:
+                fp = asset_store.write("audio", key, b"".join(f.result() for f in futures))
+                print(f"[INFO] Saved: {fp}  ('{title}' part {idx}, voice={voice})")
+            keys.append(key)
+        except Exception as e:
+            print(f"[WARN] Couldn’t voice '{title}' part {idx}: {e}")
+    if len(keys) == len(jobs):
+        asset_store.link(bid, "audio", keys, title)
+    return [asset_store.path("audio", k) for k in keys]
+
+def ensure_voices(book: dict) -> tuple[list[str], bool]:
+    """Voice one book unless the manifest says its MP3s are up to date.
+
+    Returns (paths, reused).
+    """
+    bid    = book_store.book_id(book)
+    digest = manifest.input_hash(book.get("summaries"), VOICE_SEED, asset_store.KINDS["audio"])
+    done   = manifest.get(bid, "voice")
+    if (manifest.is_done(bid, "voice", digest) and asset_store.book_keys(bid, "audio")
+            and all(os.path.exists(p) for p in done.get("files", []))):
+        return done.get("files", []), True
+    paths = voice_book(book)
+    if paths and len(paths) == sum(1 for t in book.get("summaries", []) if t.strip()):
+        manifest.mark_done(bid, "voice", digest, files=paths)
+    return paths, False
+
+def generate_voices(summary_file: str = SUMMARY_FP):
+    if not os.path.exists(summary_file):
+        print(f"[ERROR] Missing {summary_file}. Run summarize.py first.")
         return
 
-    for book in data:
-        title = book.get("title", "Untitled")
-        for idx, text in enumerate(book.get("summaries", []), start=1):
-            if not text.strip():
-                continue
-            try:
-                voice = random.choice(VOICES)
-                tts   = gTTS(text=text, lang=voice.split("-")[0])
-                fp    = os.path.join(out_dir, f"{sanitize(title)}_part{idx}.mp3")
-                tts.save(fp)
-                print(f"[INFO] Saved: {fp}  (voice={voice})")
-            except Exception as e:
-                print(f"[WARN] Couldn’t voice '{title}' part {idx}: {e}")
+    empty = True
+    skipped = 0
+    for book in book_store.iter_records(summary_file):
+        empty = False
+        _, reused = ensure_voices(book)
+        skipped += reused
+
+    if empty:
+        print(f"[WARN] {summary_file} is empty.")
+    elif skipped:
+        print(f"[INFO] Voices → {skipped} books already up to date")
 
 if __name__ == "__main__":
-    generate_voices()
+    with metrics.instrumented("voice_generator"):
+        generate_voices()